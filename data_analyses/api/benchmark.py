@@ -0,0 +1,316 @@
+"""Latency and memory benchmark of the API endpoints at scaled data sizes.
+
+Every endpoint is driven through TestClient against the data in
+OLYMPICS_DATA_PATH ("real") and against synthetic datasets with 1x, 10x and
+100x the athlete_events row count and event count. Each dataset runs in its
+own process, with the process pool disabled so the computation is measured
+in-process. Results (p50/p95/p99/max latency, the cold first call and the
+peak memory allocated by the request) go to a JSON file. Passing --baseline
+compares them against a previous run and exits with status 1 on regressions.
+
+    python benchmark.py --scales real 1 10 --output bench.json
+    python benchmark.py --baseline bench.json             # compare
+    python benchmark.py --baseline bench.json --update    # record a new baseline
+
+The 100x dataset needs several GB of memory. At that size the Event-level
+pairwise distances (O(n^2)) are skipped; see MAX_PAIRS.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from datasets import DATA_PATH, SPORT, EVENT
+import derived
+from storage import find_artifact, read_table, write_table
+
+# Tamanho do athlete_events.csv original (Kaggle), usado quando ele não está no DATA_PATH
+ATHLETE_ROWS = 271116
+ATHLETE_EVENTS = 765
+
+SCALES = ["real", "1", "10", "100"]
+REPEAT = 20
+SEED = 0
+
+# Tolerância antes de acusar regressão: relativa e absoluta
+THRESHOLD = 0.25
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_MB = 1.0
+
+# Acima disso (float32 = 4 bytes por par) o getSportsDistance não é medido
+MAX_PAIRS = 50_000_000
+
+WORK_DIR = os.path.join(tempfile.gettempdir(), "olympics_benchmark")
+
+N_SPORTS = 66
+N_NOCS = 200
+GLOBAL_ROWS = 20000
+
+
+def real_size(base_path: str = DATA_PATH) -> tuple:
+    """(rows, events) of the real athlete_events, or the original dataset sizes if absent."""
+    try:
+        events = read_table("athlete_events", columns=["Event"], base_path=base_path)["Event"]
+    except FileNotFoundError:
+        return ATHLETE_ROWS, ATHLETE_EVENTS
+    return len(events), events.nunique()
+
+
+def make_synthetic(base_path: str, rows: int, events: int, seed: int = SEED):
+    """Writes every table the API reads, derived from a synthetic athlete_events."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(base_path, exist_ok=True)
+
+    sports = np.array([f"Sport {i}" for i in range(N_SPORTS)], dtype=object)
+    event_sport = np.arange(events) % N_SPORTS
+    event_sex = np.where(np.arange(events) % 2 == 0, "M", "F")
+    event_names = np.array([f"{sports[s]} {'Men' if x == 'M' else 'Women'}'s Event {i}"
+                            for i, (s, x) in enumerate(zip(event_sport, event_sex))], dtype=object)
+    height_offset = rng.normal(0, 6, events)
+    weight_offset = rng.normal(0, 8, events)
+    age_offset = rng.normal(0, 3, events)
+
+    nocs = np.array(["BRA"] + [f"N{i:02d}" for i in range(1, N_NOCS)], dtype=object)
+    gdp = rng.lognormal(9, 1, N_NOCS)
+    years = np.arange(1896, 2017, 2)
+    seasons = np.where(years % 4 == 0, "Summer", "Winter")
+
+    event = rng.integers(0, events, rows)
+    male = event_sex[event] == "M"
+    height = rng.normal(np.where(male, 178, 167) + height_offset[event], 7).round()
+    weight = rng.normal(height - 100 + weight_offset[event], 6).round()
+    age = rng.normal(25 + age_offset[event], 4).round().clip(10, 70)
+    noc = rng.integers(0, N_NOCS, rows)
+    year_index = rng.integers(0, len(years), rows)
+    height[rng.random(rows) < 0.2] = np.nan
+    weight[rng.random(rows) < 0.2] = np.nan
+
+    athletes = pd.DataFrame({
+        "ID": np.arange(rows),
+        "Name": pd.Categorical.from_codes(np.arange(rows) % max(rows // 2, 1),
+                                          [f"Athlete {i}" for i in range(max(rows // 2, 1))]),
+        "Sex": pd.Categorical(event_sex[event]),
+        "Age": age,
+        "Height": height,
+        "Weight": weight,
+        "Team": pd.Categorical.from_codes(noc, nocs),
+        "NOC": pd.Categorical.from_codes(noc, nocs),
+        "Games": pd.Categorical.from_codes(year_index, [f"{y} {s}" for y, s in zip(years, seasons)]),
+        "Year": years[year_index],
+        "Season": pd.Categorical(seasons[year_index]),
+        "City": pd.Categorical.from_codes(np.zeros(rows, dtype=np.int8), ["City"]),
+        "Sport": pd.Categorical.from_codes(event_sport[event], sports),
+        "Event": pd.Categorical.from_codes(event, event_names),
+        "Medal": pd.Categorical.from_codes(
+            rng.choice(4, rows, p=[0.85, 0.05, 0.05, 0.05]) - 1, ["Gold", "Silver", "Bronze"]),
+    })
+    write_table(athletes, "athlete_events", csv=False, base_path=base_path)
+
+    features = athletes.dropna(subset=["Age", "Height", "Weight"])[["Sex", "Age", "Height", "Weight", "NOC", "Sport", "Event"]]
+    features["BMI"] = derived.column(features, "BMI")
+    features["GDP"] = gdp[features["NOC"].cat.codes.to_numpy()]
+    write_table(features[["Sex", "Age", "Height", "BMI", "GDP", "Sport", "Event"]], "features", csv=False,
+                base_path=base_path)
+
+    for index_column, name, your_name in ((SPORT, "by_sport", "yourSports"), (EVENT, "by_event", "yourEvents")):
+        grouped = features.groupby([index_column, "Sex"], observed=True)[["Age", "Height", "Weight", "BMI", "GDP"]]
+        table = grouped.mean().reset_index()
+        table[index_column] = table[index_column].astype(str)
+        table["Sex"] = table["Sex"].astype(str)
+        write_table(table, name, csv=False, base_path=base_path)
+        write_table(table.drop(columns=["BMI"]), your_name, csv=False, base_path=base_path)
+
+    sample = features.sample(min(GLOBAL_ROWS, len(features)), random_state=seed)
+    write_table(sample[["Age", "Height", "BMI", "Sex"]], "global_distribution", csv=False, base_path=base_path)
+    write_table(pd.DataFrame({"NOC": nocs, "GDP": gdp}), "noc_gdp", csv=False, base_path=base_path)
+
+
+def synthetic_dataset(scale: int, work_dir: str = WORK_DIR, seed: int = SEED) -> str:
+    """Directory of the synthetic dataset at `scale`, generated only if not there yet."""
+    rows, events = real_size()
+    base_path = os.path.join(work_dir, f"x{scale}-seed{seed}")
+    marker = os.path.join(base_path, "dataset.json")
+    spec = {"rows": rows * scale, "events": events * scale, "seed": seed}
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == spec:
+                return base_path
+    print(f"Gerando dataset sintético {scale}x ({spec['rows']} linhas, {spec['events']} eventos)...", file=sys.stderr)
+    make_synthetic(base_path, spec["rows"], spec["events"], seed)
+    with open(marker, "w") as f:
+        json.dump(spec, f)
+    return base_path
+
+
+def cases(base_path: str) -> Dict[str, tuple]:
+    """(path, params) of each benchmarked request, using names present in the dataset."""
+    by_sport = read_table("by_sport", base_path=base_path)
+    by_event = read_table("by_event", base_path=base_path)
+    sports = sorted(by_sport[SPORT].astype(str).unique())[:2]
+    events = sorted(by_event[EVENT].astype(str).unique())[:2]
+    noc = str(read_table("noc_gdp", base_path=base_path)["NOC"].iloc[0])
+    user = json.dumps({"Height": 173, "Weight": 70, "Age": 24, "Sex": "M", "NOC": noc})
+
+    selected = {
+        "fairestSports Sport": ("/api/fairestSports", {"agg_level": SPORT, "gender": "M", "names": sports}),
+        "fairestSports Event": ("/api/fairestSports", {"agg_level": EVENT, "gender": "ANY", "names": events}),
+        "getSportsDistance Sport": ("/api/getSportsDistance", {"agg_level": SPORT, "sex": "M"}),
+        "getSportsDistance Event": ("/api/getSportsDistance", {"agg_level": EVENT, "sex": "ANY", "top_k": 100}),
+        "getSportsForUser Sport": ("/api/getSportsForUser", {"_user_data": user, "agg_level": SPORT}),
+        "getSportsForUser Event": ("/api/getSportsForUser", {"_user_data": user, "agg_level": EVENT}),
+        "timeTendencies Sport": ("/api/timeTendencies",
+                                 {"isSportsOrEvents": "sports", "feature": "Height", "sportsOrEvents": sports}),
+        "timeTendencies Event": ("/api/timeTendencies",
+                                 {"isSportsOrEvents": "events", "feature": "Medal", "sportsOrEvents": events}),
+        "getFeatures Sport": ("/api/getFeatures", {"agg_level": SPORT, "names": sports, "gender": "M"}),
+        "getNames Event": ("/api/getNames", {"agg_level": EVENT}),
+    }
+    n_events = len(by_event)
+    if n_events * (n_events - 1) // 2 > MAX_PAIRS:
+        del selected["getSportsDistance Event"]
+    return selected
+
+
+def percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q))
+
+
+def run_cases(base_path: str, repeat: int) -> dict:
+    """Runs in the dataset's own process (see main): warmup, then every case."""
+    from fastapi.testclient import TestClient
+    from endpoints import app, response_cache
+
+    start = time.perf_counter()
+    with TestClient(app) as client:
+        warmup_s = time.perf_counter() - start
+        results = {}
+        for label, (path, params) in cases(base_path).items():
+            # Primeira chamada: inclui índices derivados que o warmup não constrói
+            start = time.perf_counter()
+            response = client.get(path, params=params)
+            cold_ms = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                results[label] = {"error": response.status_code}
+                continue
+
+            latencies = []
+            for _ in range(repeat):
+                # Sem o cache de respostas, para medir o trabalho do handler
+                response_cache.clear()
+                start = time.perf_counter()
+                client.get(path, params=params)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            response_cache.clear()
+            tracemalloc.start()
+            client.get(path, params=params)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[label] = {
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": max(latencies),
+                "cold_ms": cold_ms,
+                "peak_mb": peak / 2 ** 20,
+                "bytes": len(response.content),
+            }
+
+    return {
+        "data_path": base_path,
+        "warmup_s": warmup_s,
+        # ru_maxrss é em KB no Linux
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "endpoints": results,
+    }
+
+
+def run_dataset(base_path: str, repeat: int) -> dict:
+    """Benchmarks `base_path` in a fresh process so tables, caches and memory peaks do not leak."""
+    # Warmup bloqueante: warmup_s mede o warmup inteiro e nenhuma medição concorre com a thread dele
+    env = {**os.environ, "OLYMPICS_DATA_PATH": base_path, "API_PROCESS_WORKERS": "0", "API_WARMUP": "blocking"}
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", base_path, "--repeat", str(repeat)],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)), check=True, capture_output=True, text=True,
+    ).stdout
+    # O JSON é a última linha; as anteriores são os prints dos handlers
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(current: dict, baseline: dict, threshold: float = THRESHOLD) -> List[str]:
+    """Regressions of `current` against `baseline` (median latency and peak memory)."""
+    regressions = []
+    for scale, result in current["results"].items():
+        base_endpoints = baseline.get("results", {}).get(scale, {}).get("endpoints", {})
+        for label, metrics in result["endpoints"].items():
+            base = base_endpoints.get(label)
+            if not base or "error" in base or "error" in metrics:
+                continue
+            checks = (("p50_ms", MIN_LATENCY_DELTA_MS), ("peak_mb", MIN_MEMORY_DELTA_MB))
+            for key, min_delta in checks:
+                limit = max(base[key] * (1 + threshold), base[key] + min_delta)
+                if metrics[key] > limit:
+                    regressions.append(f"{scale} {label}: {key} {metrics[key]:.2f} > {base[key]:.2f} (+{threshold:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=SCALES, help="real and/or synthetic multipliers")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", help="where to write the results (default: stdout)")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--update", action="store_true", help="write the results to --baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--work-dir", default=WORK_DIR, help="where synthetic datasets are kept")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_cases(args.run, args.repeat)))
+        return
+
+    current = {"python": platform.python_version(), "machine": platform.machine(), "repeat": args.repeat,
+               "results": {}}
+    for scale in args.scales:
+        base_path = DATA_PATH if scale == "real" else synthetic_dataset(int(scale), args.work_dir)
+        if scale == "real":
+            try:
+                find_artifact("athlete_events", base_path)
+            except FileNotFoundError:
+                print(f"athlete_events não encontrado em {base_path}, pulando 'real'", file=sys.stderr)
+                continue
+        print(f"Medindo {scale}...", file=sys.stderr)
+        current["results"][scale] = run_dataset(os.path.abspath(base_path), args.repeat)
+
+    text = json.dumps(current, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    elif not (args.baseline and args.update):
+        print(text)
+
+    if args.baseline and args.update:
+        with open(args.baseline, "w") as f:
+            f.write(text)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(current, json.load(f), args.threshold)
+        for regression in regressions:
+            print("REGRESSÃO", regression, file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
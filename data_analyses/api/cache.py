@@ -0,0 +1,118 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Tamanho máximo (bytes) somando os corpos guardados no cache
+MAX_BYTES = int(os.environ.get("API_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Parâmetros de lista cuja ordem não muda a resposta
+UNORDERED_PARAMS = {"names", "features"}
+
+CACHEABLE_MEDIA_TYPES = {"application/json", "application/vnd.apache.arrow.stream"}
+
+
+def canonical_query(request: Request) -> tuple:
+    """Query parameters as a hashable key: sorted by name, unordered lists sorted and deduplicated."""
+    params: Dict[str, List[str]] = {}
+    for key, value in request.query_params.multi_items():
+        params.setdefault(key, []).append(value)
+    for key in UNORDERED_PARAMS & params.keys():
+        params[key] = sorted(set(params[key]))
+    return tuple(sorted((key, tuple(values)) for key, values in params.items()))
+
+
+class ResponseCache:
+    """LRU of serialized response bodies, bounded by the total size of the bodies."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, body: bytes, media_type: str) -> tuple:
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = (etag, body, media_type)
+        if len(body) > self.max_bytes:
+            return entry
+        if key in self._entries:
+            self.size -= len(self._entries.pop(key)[1])
+        self._entries[key] = entry
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, old_body, _) = self._entries.popitem(last=False)
+            self.size -= len(old_body)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Caches GET responses of `routes` keyed on path, canonical query, Accept and data version.
+
+    `routes` maps each cached path to the registry tables its response depends
+    on; when one of those files changes the key changes too. Every cached
+    response carries an ETag, and a matching If-None-Match gets a 304.
+    """
+
+    def __init__(self, app, routes: Dict[str, List[str]], registry, cache: ResponseCache):
+        super().__init__(app)
+        self.routes = routes
+        self.registry = registry
+        self.cache = cache
+
+    def _respond(self, request: Request, entry: tuple, cache_status: str) -> Response:
+        etag, body, media_type = entry
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept", "X-Cache": cache_status}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    async def dispatch(self, request: Request, call_next):
+        tables = self.routes.get(request.url.path)
+        if request.method != "GET" or tables is None:
+            return await call_next(request)
+
+        # O Accept entra na chave porque a mesma consulta pode ser respondida em JSON ou Arrow
+        key = (request.url.path, canonical_query(request), request.headers.get("accept", ""),
+               self.registry.data_version(tables))
+        entry = self.cache.get(key)
+        if entry is not None:
+            return self._respond(request, entry, "HIT")
+
+        response = await call_next(request)
+        media_type = response.headers.get("content-type", "").split(";")[0]
+        if response.status_code != 200 or media_type not in CACHEABLE_MEDIA_TYPES:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        entry = self.cache.put(key, body, media_type)
+        return self._respond(request, entry, "MISS")
@@ -0,0 +1,38 @@
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+from starlette.requests import Request
+from starlette.responses import Response
+
+from metrics import stage
+
+ARROW = "arrow"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def wants_arrow(request: Request, format: Optional[str] = None) -> bool:
+    """True when the client asked for Arrow, with format=arrow or in the Accept header."""
+    return format == ARROW or ARROW_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def render_arrow(content, metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """Arrow IPC stream of `content` (a DataFrame, or a list of dicts such as an error).
+
+    Columns go straight from their numpy/categorical arrays to Arrow, without
+    creating a Python object per cell.
+    """
+    df = content if isinstance(content, pd.DataFrame) else pd.DataFrame(content)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_response(content, metadata: Optional[Dict[str, str]] = None) -> Response:
+    with stage("serialization"):
+        body = render_arrow(content, metadata)
+    return Response(content=body, media_type=ARROW_MEDIA_TYPE)
@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+from typing import Optional
+
+import pandas as pd
+
+# Camada de armazenamento compartilhada com o pipeline (data_transformers/storage.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_transformers"))
+from storage import find_artifact, read_table
+from metrics import stage
+
+# Os handlers recebem views rasas das tabelas em memória. Com copy-on-write
+# qualquer escrita feita por um handler gera uma cópia local, então a tabela
+# carregada nunca é alterada.
+pd.set_option("mode.copy_on_write", True)
+
+DATA_PATH = os.environ.get("OLYMPICS_DATA_PATH", "../data/")
+
+# Agg levels
+SPORT = "Sport"
+EVENT = "Event"
+
+# Tabela agregada de cada agg level
+AGG_TABLES = {SPORT: "by_sport", EVENT: "by_event"}
+
+# Gender
+M = "M"
+F = "F"
+ANY = "ANY"
+SEXES = (M, F, ANY)
+
+CATEGORICAL = "category"
+
+AGGREGATED_DTYPES = {
+    "Sport": CATEGORICAL,
+    "Event": CATEGORICAL,
+    "Sex": CATEGORICAL,
+    "Age": "float64",
+    "Height": "float64",
+    "Weight": "float64",
+    "BMI": "float64",
+    "GDP": "float64",
+}
+
+# Nome da tabela -> artefato no storage, dtypes usados na leitura e colunas derivadas
+# (derived.py) calculadas no load quando o artefato não as tem
+TABLES = {
+    "by_sport": {"artifact": "by_sport", "dtype": AGGREGATED_DTYPES, "derive": ["Weight"]},
+    "by_event": {"artifact": "by_event", "dtype": AGGREGATED_DTYPES, "derive": ["Weight"]},
+    "your_sports": {"artifact": "yourSports", "dtype": AGGREGATED_DTYPES},
+    "your_events": {"artifact": "yourEvents", "dtype": AGGREGATED_DTYPES},
+    "features": {"artifact": "features", "dtype": AGGREGATED_DTYPES},
+    "global_distribution": {
+        "artifact": "global_distribution",
+        "dtype": {"Sex": CATEGORICAL, "Age": "float64", "Height": "float64", "BMI": "float64"},
+    },
+    "noc_gdp": {"artifact": "noc_gdp", "dtype": {"NOC": CATEGORICAL, "GDP": "float64"}},
+    "noc_year_gdp": {"artifact": "noc_year_gdp", "dtype": {"NOC": CATEGORICAL, "Year": "int64", "GDP": "float64"}},
+    "athlete_events": {
+        "artifact": "athlete_events",
+        "dtype": {
+            "ID": "int64",
+            "Name": "string",
+            "Sex": CATEGORICAL,
+            "Age": "float64",
+            "Height": "float64",
+            "Weight": "float64",
+            "Team": "string",
+            "NOC": CATEGORICAL,
+            "Games": "string",
+            "Year": "int64",
+            "Season": CATEGORICAL,
+            "City": "string",
+            "Sport": CATEGORICAL,
+            "Event": CATEGORICAL,
+            "Medal": CATEGORICAL,
+        },
+    },
+}
+
+
+class DatasetRegistry:
+    """Keeps every table of TABLES in memory, loaded once.
+
+    `get` hands out a shallow view of the cached DataFrame and only re-reads
+    the artifact when its file (path, mtime or size) changed since the last load.
+    """
+
+    def __init__(self, base_path: str = DATA_PATH, tables: dict = TABLES):
+        self.base_path = base_path
+        self.tables = tables
+        self._frames = {}
+        self._versions = {}
+        self._derived = {}
+        # Um lock por tabela e por índice: carregar/montar um não bloqueia quem usa
+        # ou monta outro. _locks_lock só protege a criação desses locks
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _lock_for(self, key) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def path(self, name: str) -> str:
+        """File currently backing the table (Parquet/Feather preferred over CSV)."""
+        return find_artifact(self.tables[name]["artifact"], self.base_path)[0]
+
+    def _stat(self, name: str) -> tuple:
+        path = self.path(name)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def _load(self, name: str) -> pd.DataFrame:
+        spec = self.tables[name]
+        with stage("load"):
+            return read_table(spec["artifact"], dtype=spec["dtype"], base_path=self.base_path,
+                              derive=spec.get("derive", ()))
+
+    def get(self, name: str) -> pd.DataFrame:
+        """Returns a read-only view of the table, reloading it if the file changed.
+
+        Raises FileNotFoundError when the table file does not exist.
+        """
+        version = self._stat(name)
+        if self._versions.get(name) != version:
+            with self._lock_for(("table", name)):
+                if self._versions.get(name) != version:
+                    self._frames[name] = self._load(name)
+                    self._versions[name] = version
+        return self._frames[name].copy(deep=False)
+
+    def version(self, name: str) -> tuple:
+        """(path, mtime_ns, size) of the table as it is currently loaded."""
+        if name not in self._versions:
+            self.get(name)
+        return self._versions[name]
+
+    def data_version(self, tables: list) -> tuple:
+        """Current on-disk version of `tables` (None for missing ones), for cache keys."""
+        versions = []
+        for name in tables:
+            try:
+                versions.append(self._stat(name))
+            except FileNotFoundError:
+                versions.append(None)
+        return tuple(versions)
+
+    def derived(self, key, tables: list, build):
+        """Memoizes `build()` under `key` until one of `tables` changes on disk.
+
+        Used for indexes computed from the tables (fairness scores, distance
+        matrices, ...), so they are rebuilt together with the data.
+        """
+        versions = tuple(self._stat(name) for name in tables)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        with self._lock_for(("derived", key)):
+            cached = self._derived.get(key)
+            if cached is None or cached[0] != versions:
+                cached = (versions, build())
+                self._derived[key] = cached
+        return cached[1]
+
+    def load_all(self, names: Optional[list] = None):
+        """Loads every available table (or only `names`). Missing files are skipped."""
+        for name in self.tables if names is None else names:
+            try:
+                self.get(name)
+            except FileNotFoundError:
+                print(f"Dataset '{name}' não encontrado em {self.base_path}")
+
+
+registry = DatasetRegistry()
+
+
+def filter_for_sex(df: pd.DataFrame, sex: str) -> pd.DataFrame:
+    if sex == ANY: return df
+    with stage("sex_filter"):
+        return df[df["Sex"] == sex]
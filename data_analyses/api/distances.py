@@ -0,0 +1,172 @@
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from datasets import registry, filter_for_sex, SEXES
+from metrics import stage
+
+# Colunas numéricas das tabelas agregadas aceitas como features de distância
+DISTANCE_COLUMNS = ["Age", "Height", "Weight", "BMI", "GDP"]
+
+
+def validate_query(sex: str, features: List[str]):
+    """Raises ValueError for a sex or feature outside the known ones.
+
+    Both go into the keys of the cached indexes, so unknown values are
+    rejected before anything is built or cached.
+    """
+    if sex not in SEXES:
+        raise ValueError(f"sex deve ser um de {', '.join(SEXES)}.")
+    unknown = [feature for feature in features if feature not in DISTANCE_COLUMNS]
+    if unknown or not features:
+        raise ValueError(f"features devem ser de {', '.join(DISTANCE_COLUMNS)}: {unknown or features}.")
+
+
+def standardize(values: np.ndarray) -> np.ndarray:
+    """Zero mean, unit variance per column (population std, like StandardScaler)."""
+    mean = values.mean(axis=0)
+    std = values.std(axis=0)
+    std[std == 0] = 1.0
+    return (values - mean) / std
+
+
+class DistanceEngine:
+    """Euclidean distances between every pair of rows, in condensed (pdist) layout.
+
+    Pair `k` of the condensed vector is (left[k], right[k]) with left < right,
+    the same order as the old nested loop over the rows.
+    """
+
+    def __init__(self, names: np.ndarray, matrix: np.ndarray):
+        # scipy/sklearn só são importados quando um índice é construído, não no import da API
+        from scipy.spatial.distance import pdist
+
+        self.names = np.asarray(names, dtype=object)
+        self.distances = pdist(matrix).astype(np.float32)
+        self.left, self.right = np.triu_indices(len(self.names), k=1)
+
+    def __len__(self):
+        return len(self.distances)
+
+    def candidates(self, names: Optional[List[str]] = None) -> np.ndarray:
+        """Positions of the pairs with at least one member in `names` (all pairs if empty)."""
+        if not names:
+            return np.arange(len(self.distances))
+        selected = np.isin(self.names, list(names))
+        return np.flatnonzero(selected[self.left] | selected[self.right])
+
+    def ranked(self, names: Optional[List[str]] = None, offset: int = 0,
+               limit: Optional[int] = None, top_k: Optional[int] = None, sort: bool = True) -> np.ndarray:
+        """Positions of the closest pairs, sorted by distance, for ranks [offset, offset + limit).
+
+        Only the first `offset + limit` (or `top_k`) pairs are partially selected and
+        sorted, the rest of the candidates is never ordered. With `sort=False` and
+        no `top_k` the candidates are sliced in pair order, without any sorting.
+        """
+        positions = self.candidates(names)
+        stop = len(positions) if limit is None else offset + limit
+        if top_k is not None:
+            stop = min(stop, top_k)
+        stop = max(min(stop, len(positions)), 0)
+        if offset >= stop:
+            return positions[:0]
+        if not sort and top_k is None:
+            return positions[offset:stop]
+        if stop < len(positions):
+            nearest = np.argpartition(self.distances[positions], stop - 1)[:stop]
+            positions = positions[nearest]
+        # Empates ficam na ordem original dos pares
+        order = np.lexsort((positions, self.distances[positions]))
+        return positions[order][offset:stop]
+
+    def columns(self, positions: np.ndarray) -> tuple:
+        """(names_1, names_2, distances) arrays of the pairs at `positions`."""
+        return self.names[self.left[positions]], self.names[self.right[positions]], self.distances[positions]
+
+    def pairs(self, positions: np.ndarray, prefix: str) -> List[dict]:
+        return pair_rows(*self.columns(positions), prefix)
+
+    def iter_pairs(self, positions: np.ndarray, prefix: str, batch_size: int = 1000) -> Iterator[dict]:
+        """Same dicts as `pairs`, built `batch_size` at a time."""
+        for start in range(0, len(positions), batch_size):
+            yield from self.pairs(positions[start:start + batch_size], prefix)
+
+
+def pair_rows(names_1: np.ndarray, names_2: np.ndarray, distances: np.ndarray, prefix: str) -> List[dict]:
+    return [
+        {f"{prefix}_1": name_1, f"{prefix}_2": name_2, "Distance": distance}
+        for name_1, name_2, distance in zip(names_1, names_2, distances.astype(float))
+    ]
+
+
+def iter_pair_rows(columns: tuple, prefix: str, batch_size: int = 1000) -> Iterator[dict]:
+    """Dicts of the pairs in `columns` (see DistanceEngine.columns), built `batch_size` at a time."""
+    names_1, names_2, distances = columns
+    for start in range(0, len(distances), batch_size):
+        stop = start + batch_size
+        yield from pair_rows(names_1[start:stop], names_2[start:stop], distances[start:stop], prefix)
+
+
+class NearestIndex:
+    """KD-tree over the standardized features of one aggregated table.
+
+    Mean and (sample) std of each feature are kept so a query vector can be
+    standardized the same way as the rows before the lookup.
+    """
+
+    def __init__(self, names: np.ndarray, values: np.ndarray):
+        from sklearn.neighbors import KDTree
+
+        self.names = np.asarray(names, dtype=object)
+        self.mean = values.mean(axis=0)
+        self.std = values.std(axis=0, ddof=1)
+        self.tree = KDTree((values - self.mean) / self.std) if len(values) else None
+
+    def __len__(self):
+        return len(self.names)
+
+    def standardize(self, vector: np.ndarray) -> np.ndarray:
+        return (np.asarray(vector, dtype=float) - self.mean) / self.std
+
+    def query(self, vector: np.ndarray, k: Optional[int] = None):
+        """Names and distances of the `k` rows closest to `vector` (all rows if k is None)."""
+        k = len(self) if k is None else min(k, len(self))
+        if self.tree is None or k == 0:
+            return self.names[:0], np.empty(0)
+        with stage("distance"):
+            distances, positions = self.tree.query(self.standardize(vector).reshape(1, -1), k=k)
+        return self.names[positions[0]], distances[0]
+
+
+def build_engine(df: pd.DataFrame, index_column: str, features: List[str]) -> DistanceEngine:
+    with stage("distance"):
+        matrix = standardize(df[features].to_numpy(dtype=float))
+        return DistanceEngine(df[index_column].to_numpy(dtype=object), matrix)
+
+
+def distance_engine(table: str, index_column: str, sex: str, features: List[str]) -> DistanceEngine:
+    """Engine for `table` filtered by `sex`, cached until the table changes.
+
+    The distance does not depend on the order of the features, so they are
+    normalized before being used as the cache key.
+    """
+    validate_query(sex, features)
+    features = sorted(set(features))
+    return registry.derived(
+        ("distance", table, sex, tuple(features)),
+        [table],
+        lambda: build_engine(filter_for_sex(registry.get(table), sex), index_column, features),
+    )
+
+
+def nearest_index(table: str, index_column: str, sex: str, features: List[str]) -> NearestIndex:
+    """NearestIndex for `table` filtered by `sex`, cached until the table changes."""
+    validate_query(sex, features)
+
+    def build():
+        df = filter_for_sex(registry.get(table), sex)
+        with stage("distance"):
+            return NearestIndex(df[index_column].to_numpy(dtype=object), df[features].to_numpy(dtype=float))
+
+    return registry.derived(("nearest", table, sex, tuple(features)), [table], build)
@@ -1,23 +1,131 @@
-from fastapi import FastAPI, Query, Body
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Query, Body, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, JSONResponse, Response
 import json
-from sklearn.preprocessing import StandardScaler
-from typing import List, Dict, Union
+from typing import Iterator, List, Dict, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
 import pandas as pd
-from scipy.stats import ks_2samp
 import numpy as np
+from datasets import registry, filter_for_sex, AGG_TABLES, SPORT, EVENT, M, F, ANY
+from distances import distance_engine, nearest_index, validate_query, iter_pair_rows
+from tendencies import feature_cube, build_cubes, iter_cube_response, cube_frame
+from storage import read_table, write_table
+import derived
+from fairness import fairness_index, RESPONSE_COLUMNS as FAIRNESS_COLUMNS
+from gdp import gdp_index, GDP_TABLES
+from cache import ResponseCache, ResponseCacheMiddleware
+from execution import ExecutionPool
+from streaming import JSON, NDJSON, ndjson_response, iter_records
+from columnar import ARROW_MEDIA_TYPE, wants_arrow, render_arrow, arrow_response
+import metrics
+from metrics import MetricsMiddleware, stage
 
-# Agg levels
-SPORT = "Sport"
-EVENT = "Event"
 
-# Gender
-M = "M"
-F = "F"
-ANY = "ANY"
+# background: aceita conexões já e fica pronto (/readyz) ao fim do warmup;
+# blocking: só aceita conexões depois do warmup; off: sem warmup
+WARMUP_MODE = os.environ.get("API_WARMUP", "background")
 
+# Features padrão de /api/getSportsDistance e as usadas por /api/getSportsForUser
+DISTANCE_FEATURES = ['Height', 'Weight', 'Age', 'GDP']
+USER_FEATURES = ['Height', 'BMI', 'Age', 'GDP']
 
-app = FastAPI()
+
+# Tabelas lidas pelos handlers que rodam no próprio servidor (as rotas pesadas rodam no pool)
+SERVER_TABLES = ["by_sport", "by_event", "your_sports", "your_events", "noc_gdp", "noc_year_gdp"]
+
+
+def warm_distance_queries():
+    # Índices de distância das consultas que o frontend faz por padrão
+    for agg_level, table in AGG_TABLES.items():
+        for sex in (M, F, ANY):
+            distance_engine(table, agg_level, sex, DISTANCE_FEATURES)
+
+
+def warm_nearest_queries():
+    # KD-trees do /api/getSportsForUser
+    for agg_level, table in AGG_TABLES.items():
+        for sex in (M, F):
+            nearest_index(table, agg_level, sex, USER_FEATURES)
+
+
+def warm(builds):
+    for build in builds:
+        try:
+            build()
+        except FileNotFoundError:
+            pass
+
+
+def warmup_pool():
+    # Índices das rotas pesadas: roda em cada processo do pool (initializer), ou no
+    # próprio servidor quando não há pool
+    warm((fairness_index, lambda: build_cubes(FEATURES), warm_distance_queries))
+
+
+def warmup():
+    # O servidor carrega só o que ele mesmo atende; com pool, os índices das rotas
+    # pesadas existem apenas nos processos do pool
+    registry.load_all(SERVER_TABLES)
+    warm((gdp_index, warm_nearest_queries))
+    if pool.workers == 0:
+        warmup_pool()
+
+
+# Rotas pesadas (KS, distâncias O(n²), groupby por ano) rodam neste pool. Cada
+# processo aquece os índices dessas rotas ao iniciar, e o pool.start() do
+# start_up só volta quando todos terminaram. As demais são consultas rápidas em
+# tabelas pequenas e rodam no servidor
+pool = ExecutionPool(preload=[__name__] if __name__ != "__main__" else None,
+                     initializer=warmup_pool if WARMUP_MODE != "off" else None)
+
+
+readiness = {"ready": False, "warmup_s": None, "error": None}
+
+
+def start_up():
+    start = time.perf_counter()
+    try:
+        if WARMUP_MODE != "off":
+            warmup()
+        pool.start()
+    except Exception as e:
+        readiness["error"] = repr(e)
+        raise
+    readiness["warmup_s"] = round(time.perf_counter() - start, 3)
+    readiness["ready"] = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_MODE == "background":
+        threading.Thread(target=start_up, name="warmup", daemon=True).start()
+    else:
+        await asyncio.to_thread(start_up)
+    yield
+    pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Rotas cujas respostas dependem só dos parâmetros e das tabelas listadas
+CACHED_ROUTES = {
+    "/api/getFeatures": ["by_sport", "by_event"],
+    "/api/getNames": ["by_sport", "by_event"],
+    "/api/fairestSports": ["features", "global_distribution"],
+    "/api/getSportsDistance": ["by_sport", "by_event"],
+    "/api/timeTendencies": ["athlete_events"],
+    "/api/gdp": GDP_TABLES,
+}
+
+response_cache = ResponseCache()
+
+# Adicionado antes do CORS para que as respostas do cache também recebam os headers de CORS
+app.add_middleware(ResponseCacheMiddleware, routes=CACHED_ROUTES, registry=registry, cache=response_cache)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,8 +133,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # HTTP methods: GET, POST, PUT, etc.
     allow_headers=["*"],  # Headers like Content-Type, Authorization, etc.
+    expose_headers=["ETag"],
 )
 
+# Por último para ser o mais externo e medir também o cache e o CORS
+app.add_middleware(MetricsMiddleware, routes=lambda: {route.path for route in app.routes})
+
+
+def cache_and_pool_metrics() -> list:
+    pool_stats = pool.stats()
+    return [
+        ("api_cache_hits_total", "counter", "Response cache hits.", response_cache.hits),
+        ("api_cache_misses_total", "counter", "Response cache misses.", response_cache.misses),
+        ("api_cache_bytes", "gauge", "Size of the cached response bodies.", response_cache.size),
+        ("api_cache_entries", "gauge", "Number of cached responses.", len(response_cache)),
+        ("api_pool_workers", "gauge", "Processes in the heavy-route pool.", pool_stats["workers"]),
+        ("api_pool_in_flight", "gauge", "Heavy computations submitted and not finished.", pool_stats["in_flight"]),
+        ("api_pool_queue_depth", "gauge", "Heavy computations waiting for a free process.", pool_stats["queue_depth"]),
+        ("api_pool_saturation", "gauge", "Fraction of the pool processes busy.", pool_stats["saturation"]),
+        ("api_pool_cancelled_total", "counter", "Heavy computations cancelled by client disconnects.",
+         pool_stats["cancelled"]),
+        ("api_pool_failed_total", "counter", "Heavy computations that raised.", pool_stats["failed"]),
+    ]
+
+
+def process_metrics() -> list:
+    # Memória deste worker; com vários workers cada scrape mostra o que respondeu
+    memory = metrics.process_memory()
+    return [("api_process_pid", "gauge", "PID of the worker answering.", os.getpid())] + [
+        (f"api_process_{kind}_bytes", "gauge", f"{kind.upper()} memory of this worker.", value)
+        for kind, value in memory.items()
+    ]
+
+
+metrics.register_collector(cache_and_pool_metrics)
+metrics.register_collector(process_metrics)
+
 # List of features for POST endpoints
 FEATURES = [
     "Name", "Age", "Height", "Weight", "Team", "NOC", "Games", "Year", 
@@ -36,13 +178,13 @@ FEATURES = [
 # Helper function to load data
 def load_data():
     try:
-        return pd.read_csv("../data/athlete_events.csv")
+        return read_table("athlete_events", base_path=registry.base_path)
     except FileNotFoundError:
         return pd.DataFrame()  # Return empty DataFrame if file is not found
 
 # Helper function to save data
 def save_data(df):
-    df.to_csv("../data/athlete_events.csv", index=False)
+    write_table(df, "athlete_events", base_path=registry.base_path)
 
 @app.get("/api")
 def read_root(data:str) -> dict:
@@ -53,37 +195,37 @@ def read_root(data:str) -> dict:
 def get_ic_and_df(agg_level:str):
     df = None,
     index_column = None
-    if agg_level == "Sport":
-        df = pd.read_csv("../data/by_sport.csv")
-        index_column = SPORT
-    elif agg_level == "Event":
-        df = pd.read_csv("../data/by_event.csv")
-        index_column = EVENT
+    if agg_level in AGG_TABLES:
+        df = registry.get(AGG_TABLES[agg_level])
+        index_column = agg_level
 
     return df, index_column
 
-def filter_for_sex(df:pd.DataFrame, sex:str):
-    if sex == ANY: return df
-    return df[df["Sex"] == sex]
-
 # Isso aqui é pra quando vocês precisarem de qq dado de um esporte ou evento
 # agg_level = esporte ou evento
 @app.get("/api/getFeatures")
-def get_features_agg(
+async def get_features_agg(
+        request: Request,
         agg_level: str = Query(..., description="Aggregation level for the features. (Sport or event)"),
         names: List[str] = Query(..., description="List of sports/event names."),
-        gender: str = Query(ANY, description="Gender")
+        gender: str = Query(ANY, description="Gender"),
+        format: str = Query(JSON, description="json, ndjson to stream one row per line, or arrow.")
 ) -> List[dict]:
     df, index_column = get_ic_and_df(agg_level)
     if index_column is None: return []
     df = filter_for_sex(df, gender)
-    filtered_df = df[df[index_column].isin(names)]
-    response = filtered_df.to_dict(orient="records")
+    filtered_df = df[df[index_column].isin(names)].sort_values([index_column, "Sex"])
+    if wants_arrow(request, format):
+        return arrow_response(filtered_df)
+    if format == NDJSON:
+        return ndjson_response(iter_records(filtered_df))
+    with stage("serialization"):
+        response = filtered_df.to_dict(orient="records")
 
-    return sorted(response)
+    return response
 
 @app.get("/api/getNames")
-def get_names(
+async def get_names(
     agg_level: str = Query(..., description="Aggregation (Sport or event) level for fairest sports."),
     gender: str = Query(ANY, description="Gender")
 
@@ -94,75 +236,51 @@ def get_names(
     return sorted(df[index_column].tolist())
 
 
-# Isso pode ser preprocessado bem facilmente, se performance for um problema
+# Índice pré-calculado em fairness.py, reconstruído só quando os dados mudam
+def compute_fairest(agg_level: str, names: List[str], gender: str) -> List[dict]:
+    table = fairness_index().get((agg_level, gender))
+    if table is None: return []
+    to_return = table[table["Name"].isin(names)]
+    with stage("serialization"):
+        return to_return[FAIRNESS_COLUMNS].to_dict(orient="records")
+
 @app.get("/api/fairestSports")
-def get_fairest(
+async def get_fairest(
+        request: Request,
         agg_level: str = Query("Sport", description="Aggregation (Sport or Event) level for fairest sports."),
         names: List[str] = Query([], description="List of sports to be returned"),
         gender: str = Query("M", description="Gender")
 ) -> List[dict]:
-    df = pd.read_csv("../data/features.csv")
-    global_dist = pd.read_csv("../data/global_distribution.csv")
-    df = filter_for_sex(df, gender)
-
-    features = ['Age', 'Height', 'BMI']
-
-    grouped = df.groupby(agg_level)
-
-    result = []
-
-    global_data = {}
-    for feature in features:
-        global_data[feature] = global_dist[feature].dropna()
-
-    # Distance collection for normalization
-    all_feature_distances = {feature: [] for feature in features}
-
-    for group_name, group_df in grouped:
-        group_result = {"Name": group_name}
-        for feature in features:
-            group_feature_data = group_df[feature].dropna()
-
-            ks_statistic, _ = ks_2samp(group_feature_data, global_data[feature])
-            group_result[feature] = ks_statistic  # KS statistic as distance
-            all_feature_distances[feature].append(ks_statistic)  # Collect for normalization
-        result.append(group_result)
-
-    # Normalize feature distances
-    for feature in features:
-        max_distance = max(all_feature_distances[feature])
-        min_distance = min(all_feature_distances[feature])
-        if max_distance > 0:  # Avoid division by zero
-            for group in result:
-                group[feature] = (group[feature] - min_distance) / (max_distance - min_distance)
-                group[feature] = 1 - group[feature]
-
-    for group in result:
-        normalized_distances = [group[feature] for feature in features]
-        group['total'] = round(np.sqrt(np.sum(np.square(normalized_distances))), 3)
-
-    result = sorted(result, key=lambda x: x['total'])
-    to_return = [x for x in result if x['Name'] in names]
-    return to_return
+    return await pool.run(request, compute_fairest, agg_level, names, gender)
 
 @app.get("/api/getSportsToCompareWithUser")
-def generateAverage(eventOrSport:str, gender:str):
+async def generateAverage(request: Request, eventOrSport:str, gender:str, format: str = JSON):
     eventOrSport = eventOrSport.lower()
     #if starts with event
     if eventOrSport.startswith("event"):
-        df = pd.read_csv("../data/yourEvents.csv")
+        df = registry.get("your_events")
     else:
-        df = pd.read_csv("../data/yourSports.csv")
+        df = registry.get("your_sports")
     
     df = df[df['Sex'] == gender]
     df = df.drop(columns=['Sex'])
-    print(df.columns)
-    return df.to_dict('records')
+    if wants_arrow(request, format):
+        return arrow_response(df)
+    with stage("serialization"):
+        return df.to_dict('records')
+
+def nearest_user_sports(agg_level: str, sex: str, vector: List[float], k: Optional[int]):
+    index = nearest_index(AGG_TABLES[agg_level], agg_level, sex, USER_FEATURES)
+    return index.query(vector, k=k)
 
 @app.get("/api/getSportsForUser")
-def get_sports_for_user(
+async def get_sports_for_user(
+    request: Request,
     _user_data: str = Query(..., description="User data for retrieving sports."),
     agg_level: str = Query(..., description="Aggregation (Sport or event) level for fairest sports."),
+    k: Optional[int] = Query(None, ge=1, description="Number of nearest sports/events. Full ranking when omitted."),
+    year: Optional[int] = Query(None, description="Use the GDP of the user NOC in this Games year (closest year with data). All-years mean when omitted."),
+    format: str = Query(JSON, description="json or arrow. In arrow the user GDP goes in the schema metadata."),
 ) -> List:
     try:
         user_data = json.loads(_user_data)
@@ -170,100 +288,104 @@ def get_sports_for_user(
         return [{"error": "Invalid JSON data."}]
 
     # Features to use for the analysis
-    used_columns = ['Height', 'BMI', 'Age', 'GDP']
-
-    df, index_column = get_ic_and_df(agg_level)
-
-    user_gender = user_data.get("Sex")
-    df = df[df['Sex'] == user_gender]
-
-    gdp_df = pd.read_csv('../data/noc_gdp.csv')
-
-    feature_means = df[used_columns].mean()
-    feature_stds = df[used_columns].std()
+    used_columns = USER_FEATURES
 
-    df[used_columns] = (df[used_columns] - feature_means) / feature_stds
+    if agg_level not in AGG_TABLES:
+        return [{"error": "agg_level must be Sport or Event."}]
+    index_column = agg_level
 
     user_noc = user_data.get('NOC')
     if not user_noc:
         return [{"error": "User NOC is missing."}]
 
-    user_gdp_row = gdp_df[gdp_df['NOC'] == user_noc]
-    if user_gdp_row.empty:
+    user_gdp = await asyncio.to_thread(lambda: gdp_index().lookup(user_noc, year))
+    if user_gdp is None:
         return [{"error": "User NOC not found in GDP data."}]
 
-    user_gdp = user_gdp_row.iloc[0]['GDP']
-
-    if 'Weight' not in user_data or 'Height' not in user_data:
+    user_bmi = derived.value('BMI', user_data)
+    if user_bmi is None:
         return [{"error": "User weight and height are required to calculate BMI."}]
-    user_bmi = user_data['Weight'] / ((user_data['Height'] / 100) ** 2)
-
-    user_row = {
-        'Height': (user_data['Height'] - feature_means['Height']) / feature_stds['Height'],
-        'BMI': (user_bmi - feature_means['BMI']) / feature_stds['BMI'],
-        'Age': (user_data['Age'] - feature_means['Age']) / feature_stds['Age'],
-        'GDP': (user_gdp - feature_means['GDP']) / feature_stds['GDP'],
-        'Sex': user_data['Sex'],
-        'NOC': user_noc,
-        index_column: "User"  # To identify the user row
-    }
 
-    df = pd.concat([df, pd.DataFrame([user_row])], ignore_index=True)
+    # O sexo entra na chave do índice em cache: valores desconhecidos são recusados antes
+    try:
+        validate_query(user_data.get("Sex"), used_columns)
+    except ValueError as e:
+        return JSONResponse([{"error": str(e)}], status_code=422)
 
-    user_index = df[df[index_column] == "User"].index[0]
-    user_features = df.loc[user_index, used_columns].values
-    df['Distance'] = df[used_columns].apply(
-        lambda row: np.linalg.norm(row - user_features), axis=1
+    user_features = {'Height': user_data['Height'], 'BMI': user_bmi, 'Age': user_data['Age'], 'GDP': user_gdp}
+
+    # Matriz padronizada e KD-tree ficam em cache por (agg_level, Sex). Fora do event loop:
+    # sem warmup a primeira consulta importa o sklearn e monta a KD-tree
+    names, distances = await asyncio.to_thread(
+        nearest_user_sports, agg_level, user_data.get("Sex"), [user_features[column] for column in used_columns], k
     )
 
-    df = df[df[index_column] != "User"]
+    if wants_arrow(request, format):
+        ranking = pd.DataFrame({index_column: names, 'Distance': distances})
+        return arrow_response(ranking, metadata={"user_gdp": str(user_gdp)})
 
-    result = df[[index_column, 'Distance']].sort_values(by='Distance').to_dict(orient='records')
+    result = [{index_column: name, 'Distance': distance} for name, distance in zip(names, distances.tolist())]
     return [result, user_gdp]
 
 
+@app.get("/api/gdp")
+async def get_gdp(
+    nocs: List[str] = Query(..., description="NOCs to look up."),
+    year: Optional[int] = Query(None, description="Games year (closest year with data). All-years mean when omitted."),
+) -> Dict[str, Optional[float]]:
+    # NOCs sem GDP (ou sem dados por ano) voltam como null
+    return gdp_index().lookup_many(nocs, year)
+
+
+# (names_1, names_2, distances) dos pares pedidos. No NDJSON só este ranking roda no pool:
+# os arrays voltam para o servidor, que monta e serializa as linhas em blocos
+def sports_distance_columns(agg_level: str, sex: str, features: List[str], names: List[str],
+                            top_k: Optional[int], offset: int, limit: Optional[int], sort: bool) -> Optional[tuple]:
+    if agg_level not in AGG_TABLES: return None
+    engine = distance_engine(AGG_TABLES[agg_level], agg_level, sex, features)
+    with stage("distance"):
+        positions = engine.ranked(names, offset=offset, limit=limit, top_k=top_k, sort=sort)
+    return engine.columns(positions)
+
+def compute_sports_distance(*args) -> List[dict]:
+    columns = sports_distance_columns(*args)
+    return [] if columns is None else list(iter_pair_rows(columns, args[0]))
 
 @app.get("/api/getSportsDistance")
-def get_sports_distance(
+async def get_sports_distance(
+        request: Request,
         agg_level: str = Query('Sport' , description="Aggregation level for sports distances."),
         sex: str = Query(ANY, description="Gender"),
-        features: List[str] = Query(['Height', 'Weight', 'Age', 'GDP'], description="List of features to calculate distances.")
-) -> List[dict]:
-    print(agg_level, sex, features)
-    df, index_column = get_ic_and_df(agg_level)
-    df = filter_for_sex(df, sex)
-    scaler = StandardScaler()
-
-    df[features] = scaler.fit_transform(df[features])
-
-    distances = []
-    for i, row1 in df.iterrows():
-        for j, row2 in df.iterrows():
-            if i >= j:
-                continue
-            distance = np.linalg.norm(row1[features].values - row2[features].values)
-            distances.append({
-                f"{index_column}_1": row1[index_column],
-                f"{index_column}_2": row2[index_column],
-                "Distance": distance
-            })
-
-    sorted_distances = sorted(distances, key=lambda x: x["Distance"])
-    return sorted_distances
-
-@app.get("/api/timeTendencies")
-def time_tendencies(
-    isSportsOrEvents: str = Query("sports", description="String with either 'sports' or 'events'"),
-    feature: str = Query("Height", description="Feature to analyze over time."),
-    sportsOrEvents: List[str] = Query([], description="List of Sports or Events to analyze."),
+        features: List[str] = Query(DISTANCE_FEATURES, description="List of features to calculate distances."),
+        names: List[str] = Query([], description="Only pairs with at least one of these sports/events."),
+        top_k: Optional[int] = Query(None, ge=0, description="Keep only the k closest pairs."),
+        offset: int = Query(0, ge=0, description="Index of the first pair returned."),
+        limit: Optional[int] = Query(None, ge=0, description="Maximum number of pairs returned."),
+        sort: bool = Query(True, description="Sort pairs by distance. Ignored when top_k is given."),
+        format: str = Query(JSON, description="json, or ndjson to stream one pair per line.")
 ) -> List[dict]:
-    print(isSportsOrEvents, feature, sportsOrEvents)
     try:
-        df = pd.read_csv("../data/athlete_events.csv")
+        validate_query(sex, features)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=422)
+    args = (agg_level, sex, features, names, top_k, offset, limit, sort)
+    if format == NDJSON:
+        # Os pares são gerados em blocos a partir dos arrays, sem montar a lista inteira
+        columns = await pool.compute(request, sports_distance_columns, *args)
+        if isinstance(columns, Response): return columns
+        return ndjson_response(iter_pair_rows(columns, agg_level) if columns is not None else [])
+    return await pool.run(request, compute_sports_distance, *args)
+
+NO_TENDENCIES_DATA = {"error": "Nenhum dado disponível para os filtros fornecidos."}
+
+# (cubo, nomes) da consulta, ou (None, erro) quando ela não pode ser respondida
+def tendencies_selection(isSportsOrEvents: str, feature: str, sportsOrEvents: List[str]):
+    try:
+        df = registry.get("athlete_events")
     except FileNotFoundError:
-        return [{"error": "Arquivo de dados não encontrado."}]
+        return None, {"error": "Arquivo de dados não encontrado."}
     except Exception as e:
-        return [{"error": f"Erro inesperado ao carregar os dados: {str(e)}"}]
+        return None, {"error": f"Erro inesperado ao carregar os dados: {str(e)}"}
 
     # Normaliza o valor de isSportsOrEvents para minúsculas
     is_sports_or_events = isSportsOrEvents.lower()
@@ -274,57 +396,203 @@ def time_tendencies(
     elif is_sports_or_events.startswith('event'):
         group_column = EVENT
     else:
-        return [{"error": "isSportsOrEvents deve ser 'sports' ou 'events'."}]
+        return None, {"error": "isSportsOrEvents deve ser 'sports' ou 'events'."}
 
     # Verifica se a feature existe no DataFrame
     if feature not in df.columns:
-        return [{"error": f"Feature '{feature}' não encontrada nos dados."}]
+        return None, {"error": f"Feature '{feature}' não encontrada nos dados."}
+
+    # Média/moda por (Year, grupo) vem do cubo pré-calculado em tendencies.py
+    cube = feature_cube(group_column, feature)
 
     # Se a lista de sportsOrEvents estiver vazia, seleciona todos os disponíveis
     if not sportsOrEvents:
-        sportsOrEvents = df[group_column].dropna().unique().tolist()
-
-  # Filtra o DataFrame com base nos esportes/eventos selecionados e remove linhas com valores nulos em 'Year' ou na feature
-    df_filtered = df[df[group_column].isin(sportsOrEvents)]
-    df_filtered = df_filtered.dropna(subset=['Year', feature])
-
-    if df_filtered.empty:
-        return [{"error": "Nenhum dado disponível para os filtros fornecidos."}]
-
-    # Converte a coluna 'Year' para string
-    df_filtered['Year'] = df_filtered['Year'].astype(int).astype(str)
-
-    # Agrupa os dados por 'Year' e pela coluna de agrupamento, calculando a média para features numéricas ou a moda para não numéricas
-    if pd.api.types.is_numeric_dtype(df_filtered[feature]):
-        df_grouped = df_filtered.groupby(['Year', group_column])[feature].mean().reset_index()
-    else:
-        df_grouped = df_filtered.groupby(['Year', group_column])[feature].agg(
-            lambda x: x.mode().iloc[0] if not x.mode().empty else np.nan
-        ).reset_index()
+        sportsOrEvents = cube.columns.tolist()
+    return cube, sportsOrEvents
 
-    if df_grouped.empty:
-        return [{"error": "Nenhum dado após o agrupamento e análise."}]
-
-    # Transforma os dados agrupados em um formato pivot para facilitar a criação de séries temporais
-    df_pivot = df_grouped.pivot(index='Year', columns=group_column, values=feature)
-
-    if df_pivot.empty:
-        return [{"error": "Nenhum dado após a transformação pivot."}]
-
-    df_pivot.reset_index(inplace=True)
+def time_tendencies_rows(*args) -> Iterator[dict]:
+    cube, selection = tendencies_selection(*args)
+    if cube is None:
+        yield selection
+        return
 
     # Prepara a resposta no formato esperado pelo frontend
-    response = []
-    for _, row in df_pivot.iterrows():
-        date = row['Year']
-        lines = {}
-        for sport_or_event in sportsOrEvents:
-            if sport_or_event in df_pivot.columns:
-                value = row.get(sport_or_event)
-                if pd.notnull(value):
-                    lines[sport_or_event] = value
-        if lines:
-            response.append({"date": date, "lines": lines})
-    print(response)
-    return response
+    empty = True
+    for row in iter_cube_response(cube, selection):
+        empty = False
+        yield row
+    if empty:
+        yield NO_TENDENCIES_DATA
+
+def compute_time_tendencies(*args) -> List[dict]:
+    return list(time_tendencies_rows(*args))
+
+def compute_time_tendencies_frame(*args):
+    cube, selection = tendencies_selection(*args)
+    if cube is None:
+        return [selection]
+    frame = cube_frame(cube, selection)
+    return frame if not frame.empty else [NO_TENDENCIES_DATA]
 
+@app.get("/api/timeTendencies")
+async def time_tendencies(
+    request: Request,
+    isSportsOrEvents: str = Query("sports", description="String with either 'sports' or 'events'"),
+    feature: str = Query("Height", description="Feature to analyze over time."),
+    sportsOrEvents: List[str] = Query([], description="List of Sports or Events to analyze."),
+    format: str = Query(JSON, description="json, ndjson to stream one year per line, or arrow (one column per name)."),
+) -> List[dict]:
+    args = (isSportsOrEvents, feature, sportsOrEvents)
+    if wants_arrow(request, format):
+        return await pool.run(request, compute_time_tendencies_frame, *args,
+                              render=render_arrow, media_type=ARROW_MEDIA_TYPE)
+    if format == NDJSON:
+        # Os cubos são montados no pool; só as linhas (uma por ano) são serializadas aqui
+        rows = await pool.compute(request, compute_time_tendencies, *args)
+        if isinstance(rows, Response): return rows
+        return ndjson_response(rows)
+    return await pool.run(request, compute_time_tendencies, *args)
+
+# /api/batch: várias consultas às rotas acima numa só requisição. O lote inteiro
+# roda numa única tarefa do pool, e as consultas com a mesma tabela e o mesmo
+# sexo reaproveitam uma única visão filtrada (já ordenada)
+BATCH_MAX_QUERIES = 200
+
+def batch_view(views: dict, agg_level: str, gender: str) -> Optional[pd.DataFrame]:
+    key = (agg_level, gender)
+    if key not in views:
+        df, index_column = get_ic_and_df(agg_level)
+        views[key] = None if index_column is None else filter_for_sex(df, gender).sort_values([index_column, "Sex"])
+    return views[key]
+
+def batch_features(views: dict, agg_level: str, names: List[str], gender: str = ANY) -> List[dict]:
+    view = batch_view(views, agg_level, gender)
+    if view is None: return []
+    with stage("serialization"):
+        return view[view[agg_level].isin(names)].to_dict(orient="records")
+
+def batch_names(views: dict, agg_level: str, gender: str = ANY) -> List[str]:
+    view = batch_view(views, agg_level, gender)
+    if view is None: return []
+    return sorted(view[agg_level].tolist())
+
+def batch_fairest(views: dict, agg_level: str = "Sport", names: List[str] = [], gender: str = "M") -> List[dict]:
+    return compute_fairest(agg_level, names, gender)
+
+def batch_sports_distance(views: dict, agg_level: str = 'Sport', sex: str = ANY, features: List[str] = DISTANCE_FEATURES,
+                          names: List[str] = [], top_k: Optional[int] = None, offset: int = 0,
+                          limit: Optional[int] = None, sort: bool = True) -> List[dict]:
+    return compute_sports_distance(agg_level, sex, features, names, top_k, offset, limit, sort)
+
+def batch_time_tendencies(views: dict, isSportsOrEvents: str = "sports", feature: str = "Height",
+                          sportsOrEvents: List[str] = []) -> List[dict]:
+    return compute_time_tendencies(isSportsOrEvents, feature, sportsOrEvents)
+
+def batch_gdp(views: dict, nocs: List[str], year: Optional[int] = None) -> Dict[str, Optional[float]]:
+    return gdp_index().lookup_many(nocs, year)
+
+# Parâmetros de cada rota no batch, com as mesmas restrições dos Query(...) das rotas GET
+class BatchParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+class FeaturesParams(BatchParams):
+    agg_level: str
+    names: List[str]
+    gender: str = ANY
+
+class NamesParams(BatchParams):
+    agg_level: str
+    gender: str = ANY
+
+class FairestParams(BatchParams):
+    agg_level: str = "Sport"
+    names: List[str] = []
+    gender: str = "M"
+
+class SportsDistanceParams(BatchParams):
+    agg_level: str = "Sport"
+    sex: str = ANY
+    features: List[str] = DISTANCE_FEATURES
+    names: List[str] = []
+    top_k: Optional[int] = Field(None, ge=0)
+    offset: int = Field(0, ge=0)
+    limit: Optional[int] = Field(None, ge=0)
+    sort: bool = True
+
+    @model_validator(mode="after")
+    def known_sex_and_features(self):
+        validate_query(self.sex, self.features)
+        return self
+
+class TimeTendenciesParams(BatchParams):
+    isSportsOrEvents: str = "sports"
+    feature: str = "Height"
+    sportsOrEvents: List[str] = []
+
+class GDPParams(BatchParams):
+    nocs: List[str]
+    year: Optional[int] = None
+
+# Rota -> (parâmetros, handler)
+BATCH_ROUTES = {
+    "/api/getFeatures": (FeaturesParams, batch_features),
+    "/api/getNames": (NamesParams, batch_names),
+    "/api/fairestSports": (FairestParams, batch_fairest),
+    "/api/getSportsDistance": (SportsDistanceParams, batch_sports_distance),
+    "/api/timeTendencies": (TimeTendenciesParams, batch_time_tendencies),
+    "/api/gdp": (GDPParams, batch_gdp),
+}
+
+def compute_batch(queries: List[dict]) -> List[dict]:
+    # Cada consulta tem o próprio status: parâmetros inválidos dão 422 e uma falha
+    # no handler dá 500 só naquela entrada, sem derrubar o lote
+    views = {}
+    results = []
+    for query in queries:
+        route = query.get("route") if isinstance(query, dict) else None
+        if route not in BATCH_ROUTES:
+            results.append({"status": 404, "error": f"Rota não suportada no batch: {route}"})
+            continue
+        model, handler = BATCH_ROUTES[route]
+        try:
+            params = model.model_validate(query.get("params") or {})
+        except ValidationError as e:
+            results.append({"status": 422, "error": json.loads(e.json(include_url=False))})
+            continue
+        try:
+            results.append({"status": 200, "body": handler(views, **params.model_dump())})
+        except ValueError as e:
+            results.append({"status": 422, "error": str(e)})
+        except Exception as e:
+            results.append({"status": 500, "error": repr(e)})
+    return results
+
+@app.post("/api/batch")
+async def batch(
+    request: Request,
+    queries: List[dict] = Body(..., embed=True, description='[{"route": "/api/getNames", "params": {...}}, ...]'),
+) -> List[dict]:
+    if len(queries) > BATCH_MAX_QUERIES:
+        return JSONResponse({"error": f"No máximo {BATCH_MAX_QUERIES} consultas por batch."}, status_code=413)
+    return await pool.run(request, compute_batch, queries)
+
+# Profundidade da fila e saturação do pool das rotas pesadas
+@app.get("/api/executionStats")
+async def execution_stats() -> dict:
+    return pool.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# Liveness: o processo está de pé e respondendo
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    return {"status": "ok"}
+
+# Readiness: tabelas carregadas, caches aquecidos e pool de processos iniciado
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    if not readiness["ready"]:
+        return JSONResponse({"status": "warming up", **readiness}, status_code=503)
+    return {"status": "ready", **readiness}
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional
+
+import numpy as np
+from starlette.requests import Request
+from starlette.responses import Response
+
+from metrics import collect, observe_spans, stage
+
+# Número de processos para as rotas pesadas. 0 executa numa thread do próprio processo
+PROCESS_WORKERS = int(os.environ.get("API_PROCESS_WORKERS", min(4, os.cpu_count() or 1)))
+
+# forkserver evita fazer fork do servidor já com threads rodando
+START_METHOD = os.environ.get("API_POOL_START_METHOD", "forkserver")
+
+# Intervalo (s) entre as verificações de desconexão do cliente
+DISCONNECT_POLL = 0.1
+
+# Status usado quando o cliente desiste antes da resposta (convenção do nginx)
+CLIENT_CLOSED_REQUEST = 499
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def render_json(content) -> bytes:
+    """Same bytes Starlette's JSONResponse would produce."""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_json_default
+    ).encode("utf-8")
+
+
+def _invoke(fn: Callable, args: tuple, render: Optional[Callable]) -> tuple:
+    # Roda no processo do pool: a serialização também sai do processo do servidor.
+    # Os spans medidos aqui voltam junto com o corpo para entrar no /metrics.
+    # Sem `render` o próprio resultado volta (picklado) para o servidor
+    with collect() as spans:
+        result = fn(*args)
+        if render is None:
+            return result, spans
+        with stage("serialization"):
+            body = render(result)
+    return body, spans
+
+
+class ExecutionPool:
+    """Bounded process pool for the CPU-bound routes.
+
+    Heavy handlers await `run`, which submits the computation to the pool and
+    stops waiting (cancelling it if it has not started yet) when the client
+    disconnects. Cheap handlers never go through here and stay on the event loop.
+    """
+
+    def __init__(self, workers: int = PROCESS_WORKERS, start_method: str = START_METHOD,
+                 preload: Optional[List[str]] = None, initializer: Optional[Callable] = None):
+        self.workers = workers
+        self.start_method = start_method
+        self.preload = preload or []
+        self.initializer = initializer
+        self._executor = None
+        # start() roda na thread do warmup enquanto os handlers já podem chamar
+        # _get_executor: sem o lock dois executores (e dois forkservers) seriam criados
+        self._executor_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == "forkserver" and self.preload:
+                    context.set_forkserver_preload(self.preload)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context, initializer=self.initializer
+                )
+            return self._executor
+
+    def start(self):
+        """Starts every worker process now and waits until all of them ran the initializer.
+
+        A task only runs after the initializer of its process, so tiny tasks are
+        submitted until each of the `workers` processes has answered one.
+        """
+        if self.workers <= 0:
+            return
+        executor = self._get_executor()
+        pids = set()
+        while True:
+            futures = [executor.submit(os.getpid) for _ in range(self.workers)]
+            pids.update(future.result() for future in futures)
+            if len(pids) >= self.workers:
+                return
+            time.sleep(DISCONNECT_POLL)
+
+    def shutdown(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def in_flight(self) -> int:
+        return self.submitted - self.completed - self.failed - self.cancelled
+
+    def stats(self) -> dict:
+        in_flight = self.in_flight
+        capacity = max(self.workers, 1)
+        return {
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "in_flight": in_flight,
+            "queue_depth": max(in_flight - capacity, 0),
+            "saturation": min(in_flight, capacity) / capacity,
+        }
+
+    async def run(self, request: Request, fn: Callable, *args, render: Callable = render_json,
+                  media_type: str = "application/json") -> Response:
+        """Runs fn(*args) off the event loop and returns render(result) as the response body.
+
+        `render` runs in the pool too, so it must be a module-level function.
+        """
+        body = await self._execute(request, fn, args, render)
+        if isinstance(body, Response):
+            return body
+        return Response(content=body, media_type=media_type)
+
+    async def compute(self, request: Request, fn: Callable, *args):
+        """Runs fn(*args) off the event loop and returns its result, for handlers that stream it.
+
+        The result is pickled back from the pool, so it should be compact (arrays
+        rather than lists of dicts). Returns a 499 Response if the client left.
+        """
+        return await self._execute(request, fn, args, None)
+
+    async def _execute(self, request: Request, fn: Callable, args: tuple, render: Optional[Callable]):
+        self.submitted += 1
+        executor = None
+        if self.workers > 0:
+            executor = self._get_executor()
+            future = executor.submit(_invoke, fn, args, render)
+            waiter = asyncio.wrap_future(future)
+        else:
+            future = None
+            waiter = asyncio.ensure_future(asyncio.to_thread(_invoke, fn, args, render))
+
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiter}, timeout=DISCONNECT_POLL)
+                if done:
+                    break
+                if await request.is_disconnected():
+                    if future is not None:
+                        future.cancel()
+                    waiter.cancel()
+                    self.cancelled += 1
+                    return Response(status_code=CLIENT_CLOSED_REQUEST)
+            body, spans = waiter.result()
+            observe_spans(spans)
+        except BrokenProcessPool:
+            # Um processo morreu: descarta o pool para que o próximo pedido crie outro
+            # (só se outro pedido ainda não o tiver substituído)
+            self.failed += 1
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+
+        self.completed += 1
+        return body
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from datasets import registry, filter_for_sex, SPORT, EVENT, M, F, ANY
+from metrics import stage
+
+FAIRNESS_FEATURES = ['Age', 'Height', 'BMI']
+
+# Colunas devolvidas por /api/fairestSports
+RESPONSE_COLUMNS = ["Name"] + FAIRNESS_FEATURES + ["total"]
+
+
+def ks_statistic(sample: np.ndarray, reference: np.ndarray) -> float:
+    """Two-sample KS distance between `sample` and an already sorted `reference`.
+
+    Same statistic as scipy.stats.ks_2samp (without the p-value). The empirical
+    CDFs only need to be compared at the sample values and right before them,
+    so each group costs O(len(sample) * log(len(reference))).
+    """
+    if len(sample) == 0:
+        return np.nan
+    sample = np.sort(sample)
+    values = np.unique(sample)
+    cdf_sample = np.searchsorted(sample, values, side='right') / len(sample)
+    cdf_sample_before = np.concatenate([[0.0], cdf_sample[:-1]])
+    cdf_reference = np.searchsorted(reference, values, side='right') / len(reference)
+    cdf_reference_before = np.searchsorted(reference, values, side='left') / len(reference)
+    return max(
+        np.max(np.abs(cdf_sample - cdf_reference)),
+        np.max(np.abs(cdf_sample_before - cdf_reference_before)),
+    )
+
+
+def build_fairness_table(df: pd.DataFrame, reference: dict, agg_level: str) -> pd.DataFrame:
+    """KS distances, normalized scores and total for every group of `agg_level`."""
+    names = []
+    distances = {feature: [] for feature in FAIRNESS_FEATURES}
+    with stage("ks"):
+        for group_name, group_df in df.groupby(agg_level, observed=True):
+            names.append(group_name)
+            for feature in FAIRNESS_FEATURES:
+                sample = group_df[feature].dropna().to_numpy()
+                distances[feature].append(ks_statistic(sample, reference[feature]))
+
+    table = pd.DataFrame({"Name": pd.Series(names, dtype=object)})
+    for feature in FAIRNESS_FEATURES:
+        ks = np.array(distances[feature], dtype=float)
+        table[f"{feature}_ks"] = ks
+        # Normaliza as distâncias e inverte: 1 = mais parecido com a população global
+        max_distance, min_distance = (ks.max(), ks.min()) if len(ks) else (0, 0)
+        if max_distance > 0:
+            table[feature] = 1 - (ks - min_distance) / (max_distance - min_distance)
+        else:
+            table[feature] = ks
+
+    scores = table[FAIRNESS_FEATURES].to_numpy()
+    table["total"] = np.round(np.sqrt(np.sum(np.square(scores), axis=1)), 3)
+    return table.sort_values("total", kind="stable").reset_index(drop=True)
+
+
+def build_fairness_index(features: pd.DataFrame, global_dist: pd.DataFrame) -> dict:
+    """Materializes the fairness table for every (agg_level, gender) combination."""
+    reference = {feature: np.sort(global_dist[feature].dropna().to_numpy()) for feature in FAIRNESS_FEATURES}
+    index = {}
+    for agg_level in (SPORT, EVENT):
+        for gender in (M, F, ANY):
+            index[(agg_level, gender)] = build_fairness_table(filter_for_sex(features, gender), reference, agg_level)
+    return index
+
+
+def fairness_index() -> dict:
+    """Fairness index for the current data, rebuilt only when the tables change."""
+    return registry.derived(
+        "fairness",
+        ["features", "global_distribution"],
+        lambda: build_fairness_index(registry.get("features"), registry.get("global_distribution")),
+    )
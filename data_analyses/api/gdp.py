@@ -0,0 +1,81 @@
+import bisect
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from datasets import registry
+from metrics import stage
+
+# noc_gdp: média de todos os anos; noc_year_gdp: média por ano dos Jogos (opcional)
+GDP_TABLES = ["noc_gdp", "noc_year_gdp"]
+
+
+class GDPIndex:
+    """NOC -> GDP lookups in dicts, optionally for a given Games year.
+
+    Without a year the all-years mean of the NOC is returned. With a year, the
+    GDP of the NOC in that year, or in its closest year with data (the earlier
+    one on ties), so a user can be compared against a chosen Olympics era.
+    """
+
+    def __init__(self, overall: Dict[str, float], by_year: Dict[str, Dict[int, float]]):
+        self.overall = overall
+        self.by_year = by_year
+        self._years = {noc: sorted(years) for noc, years in by_year.items()}
+
+    @classmethod
+    def from_tables(cls, noc_gdp: pd.DataFrame, noc_year_gdp: Optional[pd.DataFrame] = None) -> "GDPIndex":
+        overall = dict(zip(noc_gdp["NOC"].astype(str), noc_gdp["GDP"].astype(float)))
+        by_year = {}
+        if noc_year_gdp is not None:
+            for noc, year, gdp in zip(noc_year_gdp["NOC"].astype(str), noc_year_gdp["Year"].astype(int),
+                                      noc_year_gdp["GDP"].astype(float)):
+                by_year.setdefault(noc, {})[year] = gdp
+        return cls(overall, by_year)
+
+    def __len__(self):
+        return len(self.overall)
+
+    def closest_year(self, noc: str, year: int) -> Optional[int]:
+        years = self._years.get(noc)
+        if not years:
+            return None
+        position = bisect.bisect_left(years, year)
+        if position == len(years):
+            return years[-1]
+        if position == 0 or years[position] == year:
+            return years[position]
+        before, after = years[position - 1], years[position]
+        return before if year - before <= after - year else after
+
+    def lookup(self, noc: str, year: Optional[int] = None) -> Optional[float]:
+        """GDP of `noc` (in `year` if given), None when the NOC has no GDP."""
+        if year is None:
+            return self.overall.get(noc)
+        years = self.by_year.get(noc)
+        if years is None:
+            return None
+        gdp = years.get(year)
+        if gdp is None:
+            gdp = years[self.closest_year(noc, year)]
+        return gdp
+
+    def lookup_many(self, nocs: Iterable[str], year: Optional[int] = None) -> Dict[str, Optional[float]]:
+        return {noc: self.lookup(noc, year) for noc in nocs}
+
+
+def build_gdp_index(tables: list) -> GDPIndex:
+    with stage("gdp_index"):
+        return GDPIndex.from_tables(*(registry.get(name) for name in tables))
+
+
+def gdp_index() -> GDPIndex:
+    """GDP index for the current data, rebuilt only when its tables change.
+
+    noc_year_gdp is optional: without it only the all-years lookups have data.
+    Raises FileNotFoundError when noc_gdp does not exist.
+    """
+    tables = [name for name, version in zip(GDP_TABLES, registry.data_version(GDP_TABLES)) if version is not None]
+    if GDP_TABLES[0] not in tables:
+        raise FileNotFoundError(f"Dataset '{GDP_TABLES[0]}' não encontrado em {registry.base_path}")
+    return registry.derived(("gdp", tuple(tables)), tables, lambda: build_gdp_index(tables))
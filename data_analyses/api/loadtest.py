@@ -0,0 +1,216 @@
+"""Load test that replays the request mix of the data_vis frontend against the API.
+
+Each "interaction" is what one page action of the frontend sends:
+
+    fairest    getNames, then fairestSports for a few of the names
+    tendencies timeTendencies for a feature and a few sports/events
+    yourSport  getSportsForUser, then getSportsToCompareWithUser
+    features   getFeatures for a few sports/events
+
+Interactions start at --rate per second (Poisson arrivals, open loop) with at
+most --concurrency in flight, or back to back on --concurrency workers when
+--rate is 0 (closed loop, gives the throughput ceiling). At the end it prints
+throughput, latency percentiles and error rate per route.
+
+    python run.py &                                   # or --start
+    python loadtest.py --duration 30 --concurrency 16 --rate 0
+    python loadtest.py --mix fairest=1,tendencies=3,yourSport=2 --rate 20 --json report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+URL = "http://localhost:8000"
+MIX = {"fairest": 1, "tendencies": 2, "yourSport": 2, "features": 1}
+
+FEATURES = ["Age", "Height", "Weight", "BMI", "Medal", "NOC"]
+NOCS = ["BRA", "USA", "FRA", "CHN", "KEN", "JPN", "GER", "ARG"]
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, names: Dict[str, List[str]], seed: int = 0):
+        self.client = client
+        self.names = names
+        self.random = random.Random(seed)
+        # rota -> [(latência em s, ok)]
+        self.samples = defaultdict(list)
+
+    async def get(self, route: str, params: dict):
+        start = time.perf_counter()
+        try:
+            response = await self.client.get(route, params=params)
+            ok = response.status_code < 400
+            body = response.json() if ok else None
+        except (httpx.HTTPError, ValueError):
+            ok, body = False, None
+        self.samples[route].append((time.perf_counter() - start, ok))
+        return body
+
+    def pick(self, agg_level: str, k: int) -> List[str]:
+        names = self.names[agg_level]
+        return self.random.sample(names, min(k, len(names)))
+
+    async def fairest(self):
+        agg_level = self.random.choice(["Sport", "Event"])
+        gender = self.random.choice(["M", "F"])
+        names = await self.get("/api/getNames", {"agg_level": agg_level, "gender": gender})
+        if names:
+            selected = self.random.sample(names, min(5, len(names)))
+            await self.get("/api/fairestSports", {"agg_level": agg_level, "gender": gender, "names": selected})
+
+    async def tendencies(self):
+        agg_level = self.random.choice(["Sport", "Event"])
+        await self.get("/api/timeTendencies", {
+            "isSportsOrEvents": "sports" if agg_level == "Sport" else "events",
+            "feature": self.random.choice(FEATURES),
+            "sportsOrEvents": self.pick(agg_level, self.random.randint(1, 5)),
+        })
+
+    async def yourSport(self):
+        sex = self.random.choice(["M", "F"])
+        user = {
+            "NOC": self.random.choice(NOCS),
+            "Age": self.random.randint(16, 45),
+            "Height": self.random.randint(150, 200),
+            "Weight": self.random.randint(45, 110),
+            "Sex": sex,
+        }
+        await self.get("/api/getSportsForUser", {"_user_data": json.dumps(user), "agg_level": "Sport"})
+        await self.get("/api/getSportsToCompareWithUser", {"eventOrSport": "Sport", "gender": sex})
+
+    async def features(self):
+        agg_level = self.random.choice(["Sport", "Event"])
+        await self.get("/api/getFeatures", {
+            "agg_level": agg_level, "names": self.pick(agg_level, 3), "gender": self.random.choice(["M", "F", "ANY"]),
+        })
+
+    async def run(self, mix: Dict[str, float], duration: float, concurrency: int, rate: float) -> float:
+        interactions = list(mix)
+        weights = [mix[name] for name in interactions]
+
+        def next_interaction():
+            return getattr(self, self.random.choices(interactions, weights)[0])()
+
+        start = time.perf_counter()
+        deadline = start + duration
+        if rate <= 0:
+            async def worker():
+                while time.perf_counter() < deadline:
+                    await next_interaction()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        else:
+            slots = asyncio.Semaphore(concurrency)
+            tasks = set()
+
+            async def limited():
+                async with slots:
+                    await next_interaction()
+
+            while time.perf_counter() < deadline:
+                task = asyncio.create_task(limited())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await asyncio.sleep(self.random.expovariate(rate))
+            await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            latencies = np.array([latency for latency, _ in samples]) * 1000
+            errors = sum(not ok for _, ok in samples)
+            routes[route] = {
+                "requests": len(samples),
+                "throughput_rps": len(samples) / elapsed,
+                "error_rate": errors / len(samples),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p90_ms": float(np.percentile(latencies, 90)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "max_ms": float(latencies.max()),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        return {"elapsed_s": elapsed, "requests": total, "throughput_rps": total / elapsed, "routes": routes}
+
+
+def print_report(report: dict):
+    print(f"{report['requests']} requisições em {report['elapsed_s']:.1f}s ({report['throughput_rps']:.1f} req/s)")
+    header = f"{'rota':<34}{'req':>7}{'req/s':>9}{'erros':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for route, stats in report["routes"].items():
+        print(f"{route:<34}{stats['requests']:>7}{stats['throughput_rps']:>9.1f}{stats['error_rate']:>8.1%}"
+              f"{stats['p50_ms']:>9.1f}{stats['p90_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in MIX:
+            raise argparse.ArgumentTypeError(f"interação desconhecida: {name} (opções: {', '.join(MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def start_server(url: str, timeout: float = 120) -> subprocess.Popen:
+    """Starts run.py and waits until it is ready (/readyz: warmup done, caches built)."""
+    server = subprocess.Popen([sys.executable, "run.py"], cwd=os.path.dirname(os.path.abspath(__file__)))
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/readyz").status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"API não respondeu em {timeout:.0f}s")
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        names = {}
+        for agg_level in ("Sport", "Event"):
+            response = await client.get("/api/getNames", params={"agg_level": agg_level})
+            names[agg_level] = response.json()
+        test = LoadTest(client, names, args.seed)
+        elapsed = await test.run(args.mix, args.duration, args.concurrency, args.rate)
+        return test.report(elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--mix", type=parse_mix, default=MIX, help="e.g. fairest=1,tendencies=2,yourSport=2,features=1")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=8, help="interactions in flight")
+    parser.add_argument("--rate", type=float, default=0, help="interactions per second (0 = as fast as possible)")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--start", action="store_true", help="start run.py and stop it at the end")
+    args = parser.parse_args()
+
+    server = start_server(args.url) if args.start else None
+    try:
+        report = asyncio.run(main(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,212 @@
+"""Prometheus-style metrics for the API, rendered in the text exposition format.
+
+- per-route latency and response-size histograms (MetricsMiddleware)
+- named stage spans inside the handlers: `with stage("groupby"): ...`
+- gauges/counters read from other components at scrape time (`register_collector`)
+
+Spans recorded inside a process-pool worker are collected with `collect()`,
+sent back with the result and merged in the server process (`observe_spans`),
+so /metrics sees the stages of every route regardless of where they ran.
+"""
+import contextvars
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Rota da requisição em andamento (rótulo dos spans); "startup" durante o warmup
+current_route = contextvars.ContextVar("current_route", default="startup")
+
+# Spans de um worker do pool, devolvidos junto com o resultado
+_collected: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("collected", default=None)
+
+
+def _format_labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        # rótulos -> (contagem por bucket, soma, total)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total, n)) for labels, (counts, total, n) in self._series.items())
+        for labels, (counts, total, n) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {n}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {n}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("api_request_duration_seconds", "Request latency until the last body byte.",
+                            LATENCY_BUCKETS, ("route",))
+RESPONSE_BYTES = Histogram("api_response_size_bytes", "Response body size.", SIZE_BUCKETS, ("route",))
+REQUESTS = Counter("api_requests_total", "Requests by route and status code.", ("route", "status"))
+STAGE_SECONDS = Histogram("api_stage_duration_seconds", "Time spent in each named stage of a route.",
+                          LATENCY_BUCKETS, ("route", "stage"))
+
+METRICS = [REQUEST_SECONDS, RESPONSE_BYTES, REQUESTS, STAGE_SECONDS]
+
+# Funções chamadas a cada scrape: devolvem [(nome, tipo, ajuda, valor)]
+_collectors: List[Callable[[], List[tuple]]] = []
+
+
+def register_collector(collector: Callable[[], List[tuple]]):
+    _collectors.append(collector)
+
+
+@contextmanager
+def stage(name: str):
+    """Times the block as stage `name` of the current route."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        collected = _collected.get()
+        if collected is not None:
+            collected.append((name, elapsed))
+        else:
+            STAGE_SECONDS.observe(elapsed, current_route.get(), name)
+
+
+@contextmanager
+def collect():
+    """Gathers the spans of the block in a list instead of observing them (pool workers)."""
+    spans = []
+    token = _collected.set(spans)
+    try:
+        yield spans
+    finally:
+        _collected.reset(token)
+
+
+def observe_spans(spans: List[tuple]):
+    route = current_route.get()
+    for name, elapsed in spans:
+        STAGE_SECONDS.observe(elapsed, route, name)
+
+
+def process_memory(pid="self") -> Dict[str, int]:
+    """rss, pss, shared and private bytes of a process (Linux; only rss elsewhere).
+
+    Pss splits each shared page among the processes mapping it, so summing the
+    pss of the workers gives the real footprint of tables shared after fork.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+              "Private_Clean": "private", "Private_Dirty": "private"}
+    memory = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    memory[fields[key]] += int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        # Sem /proc: só o pico de RSS do próprio processo (KB no Linux, bytes no macOS)
+        memory["rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return memory
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        for name, kind, help, value in collector():
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and counting its body bytes.
+
+    Requests are labeled with the route path when it is one of `routes`, and
+    "other" otherwise, so unknown URLs do not create new series.
+    """
+
+    def __init__(self, app, routes: Callable[[], set]):
+        self.app = app
+        self.routes = routes
+        self._known = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._known is None:
+            self._known = self.routes()
+        route = scope["path"] if scope["path"] in self._known else "other"
+        token = current_route.set(route)
+        start = time.perf_counter()
+        status = [500]
+        size = [0]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            elif message["type"] == "http.response.body":
+                size[0] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route)
+            RESPONSE_BYTES.observe(size[0], route)
+            REQUESTS.inc(route, str(status[0]))
+            current_route.reset(token)
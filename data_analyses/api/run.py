@@ -1,8 +1,12 @@
+import os
+
 from endpoints import app
 import uvicorn
 
-# if in prod this should be False, in dev it should be True
-RELOAD = True
+# Reload só em desenvolvimento: API_RELOAD=1
+RELOAD = os.environ.get("API_RELOAD", "0") == "1"
+HOST = os.environ.get("API_HOST", "0.0.0.0")
+PORT = int(os.environ.get("API_PORT", 8000))
 
 if __name__ == "__main__":
-    uvicorn.run("endpoints:app", host="0.0.0.0", port=8000, reload=RELOAD)
\ No newline at end of file
+    uvicorn.run("endpoints:app", host=HOST, port=PORT, reload=RELOAD)
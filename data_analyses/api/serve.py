@@ -0,0 +1,174 @@
+"""Production runner: loads the datasets once, then forks N uvicorn workers.
+
+The parent process imports the app and runs the warmup (tables, fairness
+index, tendency cubes, distance indexes) before forking. The workers inherit
+those pages copy-on-write: numeric columns and memory-mapped feature stores
+keep a single physical copy no matter how many workers there are. All workers
+accept connections from the same listening socket.
+
+    python serve.py --workers 4
+
+Signals sent to the parent:
+    SIGHUP       graceful restart: reload changed tables, start a new set of
+                 workers, then stop the old ones after their in-flight requests
+    SIGUSR1      log the memory of each worker
+    SIGTERM/INT  graceful shutdown
+
+Workers that die are replaced. Each worker's memory (rss/pss/shared/private)
+is logged every --report-interval seconds and exposed on its /metrics.
+Linux/macOS only (needs os.fork).
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+# Nos workers as rotas pesadas rodam em threads: o paralelismo vem dos próprios workers,
+# e um pool de processos por worker multiplicaria a memória
+os.environ.setdefault("API_PROCESS_WORKERS", "0")
+os.environ.setdefault("API_WARMUP", "blocking")
+
+import uvicorn
+
+import endpoints
+from metrics import process_memory
+
+HOST = os.environ.get("API_HOST", "0.0.0.0")
+PORT = int(os.environ.get("API_PORT", 8000))
+WORKERS = int(os.environ.get("API_WORKERS", os.cpu_count() or 1))
+
+# Tempo (s) que um worker tem para terminar as requisições em andamento
+GRACEFUL_TIMEOUT = 30
+REPORT_INTERVAL = 60
+
+
+def log(message: str):
+    print(f"[serve {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+class Supervisor:
+    def __init__(self, host: str, port: int, workers: int, graceful_timeout: float, report_interval: float):
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.report_interval = report_interval
+        self.sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+        # pid -> geração; um SIGHUP cria uma geração nova
+        self.children = {}
+        self.generation = 0
+        self.signals = []
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            for signum in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, signal.SIG_DFL)
+            config = uvicorn.Config(endpoints.app, timeout_graceful_shutdown=self.graceful_timeout)
+            uvicorn.Server(config).run(sockets=[self.sock])
+            os._exit(0)
+        self.children[pid] = self.generation
+        log(f"worker {pid} iniciado (geração {self.generation})")
+
+    def report(self):
+        total_pss = 0
+        for pid in sorted(self.children):
+            memory = {kind: value / 2 ** 20 for kind, value in process_memory(pid).items()}
+            total_pss += memory["pss"]
+            log(f"worker {pid}: rss {memory['rss']:.0f} MB, pss {memory['pss']:.0f} MB, "
+                f"shared {memory['shared']:.0f} MB, private {memory['private']:.0f} MB")
+        parent = process_memory()["pss"] / 2 ** 20
+        log(f"total pss {total_pss + parent:.0f} MB ({len(self.children)} workers + supervisor {parent:.0f} MB)")
+
+    def stop_generation(self, generation=None):
+        """SIGTERM to the workers (of `generation`, or all); SIGKILL after the graceful timeout."""
+        targets = [pid for pid, gen in self.children.items() if generation is None or gen == generation]
+        for pid in targets:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.time() + self.graceful_timeout
+        while targets and time.time() < deadline:
+            targets = [pid for pid in targets if not self.reap(pid)]
+            time.sleep(0.1)
+        for pid in targets:
+            log(f"worker {pid} não terminou a tempo, enviando SIGKILL")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.children.pop(pid, None)
+
+    def reap(self, pid: int = -1) -> bool:
+        """Collects finished workers; True if `pid` (or any worker, with -1) finished."""
+        finished = False
+        while self.children:
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if done == 0:
+                break
+            finished = True
+            self.children.pop(done, None)
+            if pid != -1:
+                break
+        return finished
+
+    def restart(self):
+        old = self.generation
+        self.generation += 1
+        log("reinício gracioso: recarregando tabelas alteradas")
+        endpoints.warmup()
+        for _ in range(self.workers):
+            self.spawn()
+        self.stop_generation(old)
+
+    def run(self):
+        log(f"carregando dados antes do fork ({self.workers} workers)")
+        start = time.perf_counter()
+        endpoints.warmup()
+        log(f"warmup em {time.perf_counter() - start:.1f}s")
+        for _ in range(self.workers):
+            self.spawn()
+
+        for signum in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+
+        next_report = time.time() + self.report_interval
+        while True:
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    log("encerrando")
+                    self.stop_generation()
+                    return
+                if signum == signal.SIGHUP:
+                    self.restart()
+                elif signum == signal.SIGUSR1:
+                    self.report()
+
+            # Repõe workers da geração atual que morreram
+            alive = dict(self.children)
+            self.reap()
+            for pid, generation in alive.items():
+                if pid not in self.children and generation == self.generation:
+                    log(f"worker {pid} saiu, iniciando outro")
+                    self.spawn()
+
+            if self.report_interval and time.time() >= next_report:
+                self.report()
+                next_report = time.time() + self.report_interval
+            time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL, help="seconds, 0 to disable")
+    args = parser.parse_args()
+
+    Supervisor(args.host, args.port, args.workers, args.graceful_timeout, args.report_interval).run()
@@ -0,0 +1,36 @@
+from typing import Iterable, Iterator
+
+import pandas as pd
+from starlette.responses import StreamingResponse
+
+from execution import render_json
+
+JSON = "json"
+NDJSON = "ndjson"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Linhas por bloco enviado ao cliente
+BATCH_SIZE = 1000
+
+
+def ndjson_lines(rows: Iterable, batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """Encodes `rows` as newline-delimited JSON, `batch_size` lines per chunk."""
+    batch = []
+    for row in rows:
+        batch.append(render_json(row))
+        if len(batch) == batch_size:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def ndjson_response(rows: Iterable, batch_size: int = BATCH_SIZE) -> StreamingResponse:
+    """Streams `rows` (any iterable, usually a generator) without materializing the full list."""
+    return StreamingResponse(ndjson_lines(rows, batch_size), media_type=NDJSON_MEDIA_TYPE)
+
+
+def iter_records(df: pd.DataFrame, batch_size: int = BATCH_SIZE) -> Iterator[dict]:
+    """Same dicts as df.to_dict("records"), converted `batch_size` rows at a time."""
+    for start in range(0, len(df), batch_size):
+        yield from df.iloc[start:start + batch_size].to_dict(orient="records")
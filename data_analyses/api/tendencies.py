@@ -0,0 +1,71 @@
+from typing import Iterator, List
+
+import pandas as pd
+
+from datasets import registry, SPORT, EVENT
+from metrics import stage
+
+
+def build_feature_cube(df: pd.DataFrame, group_column: str, feature: str) -> pd.DataFrame:
+    """Year x group table of `feature`: the mean for numeric features, the mode otherwise.
+
+    Rows are the years as strings (sorted), columns are the groups in the order
+    they first appear in the data.
+    """
+    with stage("groupby"):
+        data = df.dropna(subset=['Year', group_column, feature])
+        keys = [data['Year'].astype(int).astype(str).rename('Year'), data[group_column].rename('group')]
+
+        if pd.api.types.is_numeric_dtype(data[feature]):
+            cells = data.groupby(keys, observed=True)[feature].mean().reset_index(name='value')
+        else:
+            # Moda vetorizada: conta cada valor por célula e fica com o mais frequente,
+            # desempatando pelo menor valor como Series.mode().iloc[0]
+            counts = data.groupby(keys + [data[feature].rename('value')], observed=True).size()
+            counts = counts[counts > 0].reset_index(name='count')
+            counts = counts.sort_values(['count', 'value'], ascending=[False, True], kind='stable')
+            cells = counts.drop_duplicates(['Year', 'group'])[['Year', 'group', 'value']]
+
+        cells['group'] = cells['group'].astype(str)
+        cube = cells.pivot(index='Year', columns='group', values='value').sort_index()
+        order = [str(name) for name in df[group_column].dropna().unique()]
+        return cube.reindex(columns=[name for name in order if name in cube.columns])
+
+
+def feature_cube(group_column: str, feature: str) -> pd.DataFrame:
+    """Cube of athlete_events for (group_column, feature), rebuilt when the file changes."""
+    return registry.derived(
+        ("tendencies", group_column, feature),
+        ["athlete_events"],
+        lambda: build_feature_cube(registry.get("athlete_events"), group_column, feature),
+    )
+
+
+def build_cubes(features: List[str]):
+    """Precomputes the cubes of every feature for both Sport and Event."""
+    columns = registry.get("athlete_events").columns
+    for group_column in (SPORT, EVENT):
+        for feature in features:
+            if feature in columns:
+                feature_cube(group_column, feature)
+
+
+def iter_cube_response(cube: pd.DataFrame, names: List[str]) -> Iterator[dict]:
+    """One {"date", "lines"} entry per year with data for at least one of `names`."""
+    columns = [name for name in dict.fromkeys(names) if name in cube.columns]
+    selected = cube[columns]
+    present = selected.notna().to_numpy()
+    values = selected.to_numpy(dtype=object)
+
+    for date, row, row_present in zip(selected.index, values, present):
+        if row_present.any():
+            lines = {name: value for name, value, ok in zip(columns, row, row_present) if ok}
+            yield {"date": date, "lines": lines}
+
+
+def cube_frame(cube: pd.DataFrame, names: List[str]) -> pd.DataFrame:
+    """Columnar form of the same data: a "date" column plus one column per name, same years."""
+    columns = [name for name in dict.fromkeys(names) if name in cube.columns]
+    selected = cube[columns]
+    selected = selected[selected.notna().any(axis=1)]
+    return selected.rename_axis(index="date", columns=None).reset_index()
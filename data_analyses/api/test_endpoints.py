@@ -1,5 +1,7 @@
 import json
 
+import pandas as pd
+
 from fastapi.testclient import TestClient
 from endpoints import app  # Replace 'main' with the filename where your app instance is defined
 
@@ -86,6 +88,11 @@ def test_get_sports_for_user():
         assert "Distance" in item, "Each item should contain a 'Distance' key"
     print(data)
 
+def test_get_sports_for_user_invalid_sex():
+    user_data = {"Height": 173, "Weight": 103, "Age": 24, "Sex": "X", "NOC": "BRA"}
+    response = client.get("/api/getSportsForUser", params={"_user_data": json.dumps(user_data), "agg_level": "Sport"})
+    assert response.status_code == 422
+
 def test_get_sports_distance():
     response = client.get(
         "/api/getSportsDistance",
@@ -106,6 +113,184 @@ def test_get_sports_distance():
         assert isinstance(item["Distance"], float), "Distance should be a float value"
     print(data)
 
+def test_get_names_etag():
+    params = {"agg_level": "Sport", "gender": "M"}
+    response = client.get("/api/getNames", params=params)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Mesma consulta com os parâmetros em outra ordem usa a mesma entrada do cache
+    cached = client.get("/api/getNames", params=[("gender", "M"), ("agg_level", "Sport")])
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.headers["ETag"] == etag
+    assert cached.json() == response.json()
+
+    not_modified = client.get("/api/getNames", params=params, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+def test_get_sports_distance_paginated():
+    params = {"agg_level": "Sport", "sex": "M", "features": ["Height", "BMI", "Age", "GDP"]}
+    full = client.get("/api/getSportsDistance", params=params).json()
+
+    response = client.get("/api/getSportsDistance", params={**params, "offset": 2, "limit": 5})
+    assert response.status_code == 200
+    assert response.json() == full[2:7], "Pagination should slice the full ranking"
+
+    response = client.get("/api/getSportsDistance", params={**params, "top_k": 3})
+    assert response.json() == full[:3], "top_k should return the k closest pairs"
+
+    response = client.get("/api/getSportsDistance", params={**params, "names": ["Football"]})
+    data = response.json()
+    assert data, "There should be pairs with Football"
+    assert all("Football" in (item["Sport_1"], item["Sport_2"]) for item in data)
+
+    # Sexo ou feature desconhecidos não criam índices novos no cache
+    from datasets import registry
+    cached = len(registry._derived)
+    assert client.get("/api/getSportsDistance", params={**params, "sex": "X"}).status_code == 422
+    assert client.get("/api/getSportsDistance", params={**params, "features": ["Name"]}).status_code == 422
+    assert len(registry._derived) == cached
+
+def test_ndjson_format():
+    params = {"agg_level": "Sport", "sex": "M", "features": ["Height", "BMI", "Age", "GDP"]}
+    full = client.get("/api/getSportsDistance", params=params).json()
+
+    response = client.get("/api/getSportsDistance", params={**params, "format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == full
+
+    params = {"isSportsOrEvents": "sports", "feature": "Height", "sportsOrEvents": ["Football", "Basketball"]}
+    full = client.get("/api/timeTendencies", params=params).json()
+    response = client.get("/api/timeTendencies", params={**params, "format": "ndjson"})
+    assert [json.loads(line) for line in response.text.splitlines()] == full
+
+def test_arrow_format():
+    import pyarrow as pa
+
+    params = {"agg_level": "Sport", "names": ["Football", "Basketball"], "gender": "M"}
+    records = client.get("/api/getFeatures", params=params).json()
+    response = client.get("/api/getFeatures", params=params, headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.to_pylist() == records, "Arrow and JSON should carry the same rows"
+
+    params = {"isSportsOrEvents": "sports", "feature": "Height", "sportsOrEvents": ["Football", "Basketball"]}
+    rows = client.get("/api/timeTendencies", params=params).json()
+    table = pa.ipc.open_stream(client.get("/api/timeTendencies", params={**params, "format": "arrow"}).content).read_all()
+    assert table.column("date").to_pylist() == [row["date"] for row in rows]
+
+def test_metrics():
+    client.get("/api/fairestSports", params={"agg_level": "Sport", "gender": "F", "names": ["Football"]})
+    client.get("/api/getNames", params={"agg_level": "Sport"})
+    client.get("/api/getNames", params={"agg_level": "Sport"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    text = response.text
+    assert 'api_request_duration_seconds_count{route="/api/fairestSports"}' in text
+    assert 'api_response_size_bytes_bucket{route="/api/getNames",le="+Inf"}' in text
+    assert 'api_stage_duration_seconds_count{route="/api/fairestSports",stage="serialization"}' in text
+    assert "api_cache_hits_total" in text and "api_pool_queue_depth" in text
+
+def test_health_and_readiness():
+    import time
+
+    assert client.get("/healthz").status_code == 200
+    # O lifespan (e o warmup) só roda com o TestClient como context manager
+    with TestClient(app) as started:
+        deadline = time.time() + 120
+        response = started.get("/readyz")
+        while response.status_code == 503 and time.time() < deadline:
+            assert response.json()["status"] == "warming up"
+            time.sleep(0.2)
+            response = started.get("/readyz")
+        assert response.status_code == 200
+        assert response.json()["ready"]
+
+def test_execution_stats():
+    before = client.get("/api/executionStats").json()
+    response = client.get("/api/getSportsDistance", params={"agg_level": "Event", "sex": "F", "top_k": 1})
+    assert response.status_code == 200
+    stats = client.get("/api/executionStats").json()
+    assert stats["completed"] == before["completed"] + 1, "Heavy routes should run in the pool"
+    assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+    assert 0 <= stats["saturation"] <= 1
+
+def test_batch():
+    queries = [
+        {"route": "/api/getNames", "params": {"agg_level": "Sport", "gender": "M"}},
+        {"route": "/api/getFeatures", "params": {"agg_level": "Sport", "names": ["Football", "Basketball"], "gender": "M"}},
+        {"route": "/api/getFeatures", "params": {"agg_level": "Sport", "names": ["Judo"], "gender": "M"}},
+        {"route": "/api/fairestSports", "params": {"agg_level": "Sport", "gender": "F", "names": ["Football"]}},
+        {"route": "/api/getSportsDistance", "params": {"agg_level": "Sport", "sex": "M", "top_k": 3}},
+        {"route": "/api/unknown"},
+        {"route": "/api/getNames", "params": {"level": "Sport"}},
+    ]
+    response = client.post("/api/batch", json={"queries": queries})
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == len(queries)
+
+    # Cada resultado é igual à resposta da rota chamada isoladamente, na ordem das consultas
+    for query, result in zip(queries[:5], results):
+        assert result["status"] == 200
+        assert result["body"] == client.get(query["route"], params=query["params"]).json()
+    assert results[5]["status"] == 404
+    assert results[6]["status"] == 422
+
+    # Tipos e limites inválidos dão 422 só na própria entrada
+    invalid = [
+        {"route": "/api/getSportsDistance", "params": {"top_k": "abc"}},
+        {"route": "/api/getSportsDistance", "params": {"top_k": -1}},
+        {"route": "/api/getSportsDistance", "params": {"features": ["Name"]}},
+        {"route": "/api/getFeatures", "params": {"agg_level": "Sport", "names": "Football"}},
+        {"route": "/api/gdp", "params": {"nocs": ["BRA"], "year": "x"}},
+        {"route": "/api/getNames", "params": {"agg_level": "Sport"}},
+    ]
+    response = client.post("/api/batch", json={"queries": invalid})
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == [422] * 5 + [200]
+
+
+def test_gdp_lookup():
+    from datasets import registry
+    from gdp import GDPIndex
+
+    gdp_df = registry.get("noc_gdp")
+    expected = float(gdp_df[gdp_df["NOC"] == "BRA"]["GDP"].iloc[0])
+
+    response = client.get("/api/gdp", params={"nocs": ["BRA", "XXX"]})
+    assert response.status_code == 200
+    assert response.json() == {"BRA": expected, "XXX": None}
+
+    # Com ano: o ano pedido ou o mais próximo com dados daquele NOC
+    index = GDPIndex.from_tables(
+        gdp_df,
+        pd.DataFrame({"NOC": ["BRA", "BRA", "BRA"], "Year": [1996, 2000, 2008], "GDP": [1.0, 2.0, 4.0]}),
+    )
+    assert index.lookup("BRA") == expected
+    assert [index.lookup("BRA", year) for year in (2000, 1960, 2004, 2005, 2016)] == [2.0, 1.0, 2.0, 4.0, 4.0]
+    assert index.lookup("XXX", 2000) is None
+
+
+def test_derived_columns():
+    import derived
+    from datasets import registry
+    from storage import read_table
+
+    # yourSports guarda Weight mas não BMI: BMI é calculado no load
+    your_sports = read_table("yourSports", columns=["Sport", "Height", "Weight"], base_path=registry.base_path)
+    with_bmi = read_table("yourSports", columns=["Sport", "BMI"], base_path=registry.base_path)
+    assert list(with_bmi.columns) == ["Sport", "BMI"]
+    pd.testing.assert_series_equal(with_bmi["BMI"], your_sports["Weight"] / (your_sports["Height"] / 100) ** 2,
+                                   check_names=False)
+
+    assert derived.value("BMI", {"Weight": 81, "Height": 180}) == 25.0
+    assert derived.value("BMI", {"Weight": 81, "Height": 0}) is None
+    assert derived.value("BMI", {"Height": 180}) is None
+
 
 def test_get_time_tendencies():
     # Define parameters for the request
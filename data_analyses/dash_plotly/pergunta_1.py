@@ -4,18 +4,20 @@ from dash import dcc, html, Input, Output, State, dash_table
 import pandas as pd
 import numpy as np
 import plotly.figure_factory as ff
-from sklearn.decomposition import PCA
 from sklearn.preprocessing import StandardScaler
-from scipy.stats import kurtosis, entropy
+import os
+import sys
 #from app import app
 
 # Certifique-se de que este módulo está disponível corretamente
 from pergunta_3 import adjust_medals
+import weighted
 
-base_file_path = '../data/'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_transformers"))
+from storage import read_table
 
 # Carregar o dataset
-df = pd.read_csv(base_file_path+'polished3_with_gdp.csv')
+df = read_table('polished3_with_gdp')
 
 # Definir atributos e colunas para normalização
 ATTRIBUTES = ["Height", "BMI", "Age", "GDP"]
@@ -206,6 +208,16 @@ layout = html.Div([
     'padding': '0 20px'
 })
 
+def weighted_distplot(kde_data, kde_weights, kde_labels):
+    # O create_distplot não aceita pesos: as curvas são recalculadas com o KDE ponderado
+    # nos mesmos pontos (o rug e o eixo x só dependem dos valores, não das repetições)
+    fig = ff.create_distplot(kde_data, kde_labels, show_hist=False)
+    curves = [trace for trace in fig.data if trace.mode == 'lines']
+    for trace, values, weights in zip(curves, kde_data, kde_weights):
+        trace.y = weighted.kde(values, weights)(np.asarray(trace.x))
+    return fig
+
+
 def register_callbacks(app):
     # Callback para controlar o colapso do menu
     @app.callback(
@@ -264,13 +276,15 @@ def register_callbacks(app):
 
         # Normalizar os dados
         scaler = StandardScaler()
-        adjusted_df[selected_features] = scaler.fit_transform(adjusted_df[selected_features])
+        scaler.fit(adjusted_df[selected_features], sample_weight=adjusted_df[weighted.WEIGHT])
+        adjusted_df[selected_features] = scaler.transform(adjusted_df[selected_features])
 
         # Dados para a tabela de estatísticas
         stats_data = []
 
         # Dados para o gráfico KDE
         kde_data = []
+        kde_weights = []
         kde_labels = []
 
         # Atualizar colunas das tabelas dinamicamente
@@ -290,20 +304,21 @@ def register_callbacks(app):
             for value in selected_values:
                 # Filtrar dados com base no tipo de filtro
                 if filter_type == 'Event':
-                    df_filtered = adjusted_df[adjusted_df['Event'] == value][selected_features]
+                    rows = adjusted_df[adjusted_df['Event'] == value]
                 else:
-                    df_filtered = adjusted_df[adjusted_df['Sport'] == value][selected_features]
+                    rows = adjusted_df[adjusted_df['Sport'] == value]
+                df_filtered = rows[selected_features]
+                weights = rows[weighted.WEIGHT]
 
                 if df_filtered.empty:
                     continue
 
                 # Aplicar PCA para redução de dimensionalidade
-                pca = PCA(n_components=1)
-                transformed = pca.fit_transform(df_filtered)
+                transformed = weighted.pca_transform(df_filtered, weights)
 
                 # Calcular kurtosis e entropia
-                kurt = kurtosis(transformed.squeeze())
-                ent = entropy(np.histogram(transformed.squeeze(), bins=10)[0])
+                kurt = weighted.kurtosis(transformed.squeeze(), weights)
+                ent = weighted.histogram_entropy(transformed.squeeze(), weights)
 
                 # Adicionar dados à tabela
                 stats_data.append({
@@ -314,11 +329,12 @@ def register_callbacks(app):
 
                 # Dados para o gráfico KDE
                 kde_data.append(transformed.squeeze())
+                kde_weights.append(weights)
                 kde_labels.append(f'{value} (PCA)')
 
             # Criar gráfico KDE combinado
             if kde_data:
-                kde_fig = ff.create_distplot(kde_data, kde_labels, show_hist=False)
+                kde_fig = weighted_distplot(kde_data, kde_weights, kde_labels)
             else:
                 kde_fig = {}
 
@@ -337,8 +353,9 @@ def register_callbacks(app):
             # Calcular kurtosis e entropia para cada atributo
             for feature in selected_features:
                 feature_data = df_filtered[feature]
-                kurt = kurtosis(feature_data)
-                ent = entropy(np.histogram(feature_data, bins=10)[0])
+                weights = df_filtered[weighted.WEIGHT]
+                kurt = weighted.kurtosis(feature_data, weights)
+                ent = weighted.histogram_entropy(feature_data, weights)
 
                 stats_data.append({
                     "event_sport": f'{value} - {feature}',
@@ -347,16 +364,17 @@ def register_callbacks(app):
                 })
 
                 kde_data.append(feature_data)
+                kde_weights.append(weights)
                 kde_labels.append(feature)
 
             # Criar gráfico KDE para cada atributo
             if kde_data:
-                kde_fig = ff.create_distplot(kde_data, kde_labels, show_hist=False)
+                kde_fig = weighted_distplot(kde_data, kde_weights, kde_labels)
             else:
                 kde_fig = {}
 
             # Calcular distâncias para eventos/esportes próximos
-            selected_mean = df_filtered[selected_features].mean().values.reshape(1, -1)
+            selected_mean = weighted.mean(df_filtered, selected_features).values.reshape(1, -1)
 
             if filter_type == 'Event':
                 other_values = df_gender['Event'].unique()
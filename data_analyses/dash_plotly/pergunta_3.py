@@ -8,34 +8,36 @@ from sklearn.decomposition import PCA
 from sklearn.manifold import MDS
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 import numpy as np
+import os
+import sys
 
-base_path_file = "../data/"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_transformers"))
+from storage import read_table
+import weighted
 
 # Load the data
-df = pd.read_csv(base_path_file+"polished3_with_gdp.csv")
+df = read_table("polished3_with_gdp")
 ATTRIBUTES = ["Height", "BMI", "Age", "GDP"]
 
 # Add gender options for the dropdown
 gender_options = [{"label": "Male", "value": "M"}, {"label": "Female", "value": "F"}]
 
 def process(dataframe):
-    grouped = dataframe.groupby(['Event', 'Sport'])[ATTRIBUTES].mean().reset_index()
+    grouped = weighted.group_mean(dataframe, ['Event', 'Sport'], ATTRIBUTES)
     scaler = StandardScaler()
     grouped[ATTRIBUTES] = scaler.fit_transform(grouped[ATTRIBUTES])
     return grouped
 
 def adjust_medals(dataframe, medal_multiplier=2):
-    copies = dataframe[dataframe['Won Medal'] == True].copy()
-    for _ in range(medal_multiplier - 2):
-        copies = pd.concat([copies, dataframe[dataframe['Won Medal'] == True]])
-    df_with_copies = pd.concat([dataframe, copies], ignore_index=True)
-    return df_with_copies
+    # Linhas com medalha pesam medal_multiplier (no mínimo 2) em vez de serem copiadas;
+    # as médias, o scaler, o PCA e o KDE usam a coluna de peso
+    return dataframe.assign(**{weighted.WEIGHT: weighted.medal_weights(dataframe['Won Medal'], medal_multiplier)})
 
 def recalculate_coords(dataframe, attributes, method='MDS', medal_multiplier=2):
-    df_with_copies = adjust_medals(dataframe, medal_multiplier=medal_multiplier)
-    df_with_copies = process(df_with_copies)
+    df_weighted = adjust_medals(dataframe, medal_multiplier=medal_multiplier)
+    df_weighted = process(df_weighted)
     scaler = MinMaxScaler()
-    feature_data = df_with_copies[attributes].reset_index(drop=True)
+    feature_data = df_weighted[attributes].reset_index(drop=True)
     scaled_feature_data = scaler.fit_transform(feature_data)
     feature_data = pd.DataFrame(scaled_feature_data, columns=feature_data.columns)
 
@@ -48,8 +50,8 @@ def recalculate_coords(dataframe, attributes, method='MDS', medal_multiplier=2):
         coords = reducer.fit_transform(feature_data)
         stress = None
 
-    return_df = pd.DataFrame(coords, columns=['x', 'y', 'z'], index=df_with_copies.index)
-    return pd.concat([df_with_copies, return_df], axis=1), stress
+    return_df = pd.DataFrame(coords, columns=['x', 'y', 'z'], index=df_weighted.index)
+    return pd.concat([df_weighted, return_df], axis=1), stress
 
 # Get the unique list of events and sports for the dropdowns
 event_options = [{"label": event, "value": event} for event in df["Event"].unique()]
@@ -0,0 +1,79 @@
+"""Weighted versions of the statistics used by the dashboards.
+
+The medal multiplier gives each medal-winning row a weight instead of copying
+it, and every statistic below equals the unweighted one computed on the frame
+with each row repeated `weight` times (up to floating point rounding), so the
+plots do not change but memory and time do not grow with the multiplier.
+"""
+import numpy as np
+import pandas as pd
+from scipy.stats import entropy, gaussian_kde
+
+# Coluna com o peso de cada linha
+WEIGHT = "Sample Weight"
+
+
+def medal_weights(won_medal: pd.Series, medal_multiplier: int = 2) -> np.ndarray:
+    # Antes as linhas com medalha eram duplicadas ao menos uma vez, então o peso mínimo é 2
+    return np.where(won_medal.to_numpy(dtype=bool), max(medal_multiplier, 2), 1)
+
+
+def group_mean(df: pd.DataFrame, by: list, columns: list, weight: str = WEIGHT) -> pd.DataFrame:
+    """Weighted `df.groupby(by)[columns].mean().reset_index()`, NaN skipped per column."""
+    weights = df[weight]
+    values = df[columns]
+    keys = [df[column] for column in by]
+    sums = values.fillna(0).mul(weights, axis=0).groupby(keys).sum()
+    totals = values.notna().mul(weights, axis=0).groupby(keys).sum()
+    return (sums / totals).reset_index()
+
+
+def mean(df: pd.DataFrame, columns: list, weight: str = WEIGHT) -> pd.Series:
+    """Weighted `df[columns].mean()`, NaN skipped per column."""
+    values = df[columns]
+    weights = values.notna().mul(df[weight], axis=0)
+    return values.fillna(0).mul(df[weight], axis=0).sum() / weights.sum()
+
+
+def pca_transform(values: np.ndarray, weights: np.ndarray, n_components: int = 1) -> np.ndarray:
+    """Weighted `PCA(n_components).fit_transform(values)`.
+
+    The components are the top eigenvectors of the weighted covariance, with
+    the sign convention of scikit-learn (largest absolute loading positive).
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    centered = values - np.average(values, axis=0, weights=weights)
+    covariance = (centered * weights[:, None]).T @ centered / weights.sum()
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    components = eigenvectors[:, np.argsort(eigenvalues)[::-1][:n_components]].T
+    signs = np.sign(components[np.arange(n_components), np.argmax(np.abs(components), axis=1)])
+    return centered @ (components * signs[:, None]).T
+
+
+def kurtosis(values: np.ndarray, weights: np.ndarray) -> float:
+    """Weighted `scipy.stats.kurtosis(values)` (Fisher, biased)."""
+    values = np.asarray(values, dtype=float)
+    deviations = values - np.average(values, weights=weights)
+    m2 = np.average(deviations ** 2, weights=weights)
+    m4 = np.average(deviations ** 4, weights=weights)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return m4 / m2 ** 2 - 3.0
+
+
+def histogram_entropy(values: np.ndarray, weights: np.ndarray, bins: int = 10) -> float:
+    """Weighted `entropy(np.histogram(values, bins)[0])`."""
+    return entropy(np.histogram(values, bins=bins, weights=weights)[0])
+
+
+def kde(values: np.ndarray, weights: np.ndarray) -> gaussian_kde:
+    """Weighted `gaussian_kde(values)` with the bandwidth of the repeated rows.
+
+    With weights scipy uses the effective sample size in Scott's rule and a
+    reliability-weighted covariance; the factor is corrected so the kernel
+    width is the one gaussian_kde picks for the sample with repeated rows.
+    """
+    weights = np.asarray(weights, dtype=float)
+    n = weights.sum()
+    correction = np.sqrt((n ** 2 - (weights ** 2).sum()) / (n * (n - 1)))
+    return gaussian_kde(values, bw_method=lambda k: n ** (-1.0 / (k.d + 4)) * correction, weights=weights)
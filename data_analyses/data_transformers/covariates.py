@@ -0,0 +1,328 @@
+"""Country covariates (GDP per capita, HDI) as dense NOC x Year arrays.
+
+Each covariate is a float array with one row per country code and one column
+per year, plus a mask of the (code, year) cells present in the source. Gaps
+can be filled along the years of each country:
+
+    interpolate     linear between the known years, the first/last known
+                    value before/after them
+    nearest         value of the closest known year (the earlier one on ties)
+    moving_average  mean of the known years within +-window//2 years, then
+                    nearest for gaps with no known year in the window
+
+Attaching a covariate to an athlete-level frame is an index gather (codes of
+the NOC column and Year offsets into the array), not a merge, so refreshing a
+covariate or adding a new one does not re-join the athlete table.
+
+Codes follow the World Bank (GDP.xls); athlete NOCs are translated with the
+same rename used by the GDP join (rename_noc).
+
+    python covariates.py --fill interpolate   # writes the covariates table (NOC, Year, GDP, HDI)
+"""
+import argparse
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from storage import DATA_PATH, read_table, write_table
+
+YEARS = [str(year) for year in range(1960, 2020)]
+
+# GDP per capita de Chinese Taipei, que não está na planilha do Banco Mundial
+TAIPEI_GDP = [
+    (1980, 3446.2), (1981, 3967.2), (1982, 4338.3), (1983, 4843.1), (1984, 5441.4), (1985, 5808.8),
+    (1986, 6541.8), (1987, 7475.6), (1988, 8264.1), (1989, 9243.6), (1990, 9999.4), (1991, 11091.9),
+    (1992, 12171.2), (1993, 13186.4), (1994, 14353.8), (1995, 15475.9), (1996, 16602.1), (1997, 17731.3),
+    (1998, 18526.5), (1999, 19903.7), (2000, 21460.9), (2001, 21512.3), (2002, 22927.3), (2003, 24277.2),
+    (2004, 26562.5), (2005, 28767.3), (2006, 31220.7), (2007, 34138.8), (2008, 34951.8), (2009, 34484.6),
+    (2010, 38404.3), (2011, 40532.6), (2012, 41741.3), (2013, 43435.5), (2014, 45494.3), (2015, 46911.0),
+    (2016, 47272.3), (2017, 48500.8), (2018, 51005.0), (2019, 53476.0), (2020, 56037.8),
+]
+
+# North korea GDP per capita 2019: 640
+N_S_KOREA_RATIO = 31902 / 640
+
+NOC_RENAME = {
+    "URS": "RUS",   # Soviet Union -> Russia
+    "IRI": "IRN",   # Iran -> Iran
+    "BRU": "BRN",   # Brunei -> Brunei
+    "EUN": "EUU",   # European Union -> European Union
+    "GDR": "DEU",   # East Germany -> Germany
+    "FRG": "DEU",   # West Germany -> Germany
+    "PLE": "PSE",   # Palestine -> Palestine
+    "TCH": "CZE",   # Czechoslovakia -> Czech Republic
+    "SKN": "KNA",   # Saint Kitts and Nevis -> Saint Kitts and Nevis
+    "MGL": "MNG",   # Mongolia -> Mongolia
+    "BIZ": "BLZ",   # Belize -> Belize
+    "BER": "BMU",   # Bermuda -> Bermuda
+    "SCG": "SRB",   # Serbia and Montenegro -> Serbia
+    "YAR": "YEM",   # Yemen Arab Republic -> Yemen
+    "GUA": "GTM",   # Guatemala -> Guatemala
+    "LAT": "LVA",   # Latvia -> Latvia
+    "MAD": "MDG",   # Madagascar -> Madagascar
+    "CHA": "TCD",   # Chad -> Chad
+    "GBS": "GNB",   # Guinea-Bissau -> Guinea-Bissau
+    "ISV": "VIR",   # U.S. Virgin Islands -> U.S. Virgin Islands
+    "ROT": "ROU",   # Romania -> Romania
+    "ANT": "CUW",   # Netherlands Antilles -> Curaçao
+    "ZIM": "ZWE",   # Zimbabwe -> Zimbabwe
+    "MAW": "MWI",   # Malawi -> Malawi
+    "ZAM": "ZMB",   # Zambia -> Zambia
+    "RHO": "ZWE",   # Rhodesia -> Zimbabwe
+    "GEQ": "GNQ",   # Equatorial Guinea -> Equatorial Guinea
+    "SOL": "SLB",   # Solomon Islands -> Solomon Islands
+    "COK": "NZL",   # Cook Islands -> New Zeland
+    "ARU": "ABW",   # Aruba -> Aruba
+    "BHU": "BTN",   # Bhutan -> Bhutan
+    "VIE": "VNM",   # Vietnam -> Vietnam
+    "UAR": "EGY",   # United Arab Republic -> Egypt
+    "TGA": "TON",   # Tonga -> Tonga
+    "KOS": "XKX",   # Kosovo -> Kosovo
+    "LES": "LSO",   # Lesotho -> Lesotho
+}
+
+
+def read_gdp(path: str, taipei_before_1980: Optional[float] = None) -> pd.DataFrame:
+    """GDP.xls in long format (Country Name, Country Code, Year, GDP), gaps still empty.
+
+    Chinese Taipei (missing from GDP.xls) comes from TAIPEI_GDP; the years before
+    1980 get `taipei_before_1980`, by default the GDP of 1980.
+    """
+    gdp_df = pd.read_excel(path).drop(columns=["Indicator Name", "Indicator Code"])
+    gdp = gdp_df.melt(id_vars=["Country Name", "Country Code"], value_vars=YEARS, var_name="Year", value_name="GDP")
+    gdp["Year"] = gdp["Year"].astype(int)
+
+    if taipei_before_1980 is None:
+        taipei_before_1980 = TAIPEI_GDP[0][1]
+    taipei = TAIPEI_GDP + [(year, taipei_before_1980) for year in range(1960, 1980)]
+    taipei = pd.DataFrame(taipei, columns=["Year", "GDP"])
+    taipei["Country Name"] = "Chinese Taipei"
+    taipei["Country Code"] = "TPE"
+    return pd.concat([gdp, taipei], ignore_index=True)
+
+
+def rename_noc(athletes: pd.DataFrame, gdp: pd.DataFrame) -> dict:
+    """NOC renames: the fixed ones plus every NOC whose Team has another code in the GDP data."""
+    rename = dict(NOC_RENAME)
+    pairs = athletes[["NOC", "Team"]].drop_duplicates().merge(gdp[["NOC", "Team"]].drop_duplicates(), on="Team")
+    pairs = pairs[pairs["NOC_x"] != pairs["NOC_y"]]
+    rename.update(zip(pairs["NOC_x"], pairs["NOC_y"]))
+    return rename
+
+
+def translate(codes: pd.Series, rename: dict) -> pd.Series:
+    """Same as `codes.replace(rename)`, computed once per distinct code instead of once per row."""
+    inverse, uniques = pd.factorize(codes)
+    renamed = pd.Series(uniques, dtype=object).replace(rename).to_numpy()
+    values = codes.to_numpy(dtype=object).copy()
+    known = inverse >= 0
+    values[known] = renamed[inverse[known]]
+    return pd.Series(values, index=codes.index, name=codes.name)
+
+
+FILLS = ("none", "interpolate", "nearest", "moving_average")
+WINDOW = 5
+
+# Nomes do HDI.csv que não são iguais aos do GDP.xls
+HDI_CODES = {
+    "Bahamas": "BHS", "Bolivia (Plurinational State of)": "BOL", "Congo": "COG",
+    "Congo (Democratic Republic of the)": "COD", "Côte d'Ivoire": "CIV", "Egypt": "EGY",
+    "Eswatini (Kingdom of)": "SWZ", "Gambia": "GMB", "Hong Kong, China (SAR)": "HKG",
+    "Iran (Islamic Republic of)": "IRN", "Korea (Republic of)": "KOR", "Kyrgyzstan": "KGZ",
+    "Lao People's Democratic Republic": "LAO", "Micronesia (Federated States of)": "FSM",
+    "Moldova (Republic of)": "MDA", "Palestine, State of": "PSE", "Saint Kitts and Nevis": "KNA",
+    "Saint Lucia": "LCA", "Saint Vincent and the Grenadines": "VCT", "Slovakia": "SVK",
+    "Tanzania (United Republic of)": "TZA", "Turkey": "TUR", "Venezuela (Bolivarian Republic of)": "VEN",
+    "Yemen": "YEM",
+}
+
+
+class Covariate:
+    def __init__(self, name: str, codes: pd.Index, first_year: int, values: np.ndarray,
+                 present: Optional[np.ndarray] = None):
+        self.name = name
+        self.codes = codes
+        self.first_year = first_year
+        self.values = values
+        self.present = present if present is not None else ~np.isnan(values)
+
+    @classmethod
+    def from_long(cls, df: pd.DataFrame, name: str, value: Optional[str] = None,
+                  code: str = "NOC", year: str = "Year") -> "Covariate":
+        """Builds the array from a long frame with one row per (code, year)."""
+        value = value or name
+        if df.duplicated([code, year]).any():
+            raise ValueError(f"'{name}' tem mais de um valor para o mesmo {code} e {year}")
+        codes = pd.Index(pd.unique(df[code]))
+        years = df[year].to_numpy(dtype=np.int64)
+        first_year = int(years.min())
+        rows = codes.get_indexer(df[code])
+        columns = years - first_year
+
+        values = np.full((len(codes), int(years.max()) - first_year + 1), np.nan)
+        present = np.zeros(values.shape, dtype=bool)
+        values[rows, columns] = df[value].to_numpy(dtype=np.float64)
+        present[rows, columns] = True
+        return cls(name, codes, first_year, values, present)
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.first_year, self.first_year + self.values.shape[1])
+
+    def filled(self, method: str = "interpolate", window: int = WINDOW) -> "Covariate":
+        """Copy with the gaps of each country filled by `method` (see the module doc)."""
+        if method not in FILLS:
+            raise ValueError(f"Preenchimento desconhecido: {method} (opções: {', '.join(FILLS)})")
+        values = self.values.copy()
+        if method == "interpolate":
+            years = np.arange(values.shape[1])
+            for row in values:
+                known = ~np.isnan(row)
+                if known.any() and not known.all():
+                    row[~known] = np.interp(years[~known], years[known], row[known])
+        elif method == "moving_average":
+            values = _moving_average(values, window)
+            values = _nearest(values)
+        elif method == "nearest":
+            values = _nearest(values)
+        return Covariate(self.name, self.codes, self.first_year, values, self.present)
+
+    def gather(self, codes, years) -> Tuple[np.ndarray, np.ndarray]:
+        """(value, present) for each (code, year) pair; NaN/False outside the array."""
+        # Um get_indexer por código distinto, não por linha
+        inverse, uniques = pd.factorize(pd.Series(codes))
+        rows = np.where(inverse >= 0, self.codes.get_indexer(uniques)[inverse], -1)
+        columns = np.asarray(years, dtype=np.int64) - self.first_year
+
+        inside = (rows >= 0) & (columns >= 0) & (columns < self.values.shape[1])
+        values = np.full(len(rows), np.nan)
+        present = np.zeros(len(rows), dtype=bool)
+        values[inside] = self.values[rows[inside], columns[inside]]
+        present[inside] = self.present[rows[inside], columns[inside]]
+        return values, present
+
+    def to_long(self) -> pd.DataFrame:
+        rows, columns = np.nonzero(self.present | ~np.isnan(self.values))
+        return pd.DataFrame({"NOC": self.codes[rows], "Year": self.first_year + columns,
+                             self.name: self.values[rows, columns]})
+
+
+def _nearest(values: np.ndarray) -> np.ndarray:
+    known = ~np.isnan(values)
+    positions = np.arange(values.shape[1])
+    # Índice do ano conhecido anterior e do seguinte em cada célula
+    previous = np.maximum.accumulate(np.where(known, positions, -1), axis=1)
+    following = np.minimum.accumulate(np.where(known, positions, values.shape[1])[:, ::-1], axis=1)[:, ::-1]
+    has_previous = previous >= 0
+    has_following = following < values.shape[1]
+    use_following = has_following & (~has_previous | (following - positions < positions - previous))
+    source = np.where(use_following, following, previous)
+    filled = np.take_along_axis(values, np.clip(source, 0, values.shape[1] - 1), axis=1)
+    return np.where(known | ~(has_previous | has_following), values, filled)
+
+
+def _moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    known = ~np.isnan(values)
+    # Somas acumuladas dos valores e das contagens: a média da janela sai de duas subtrações
+    sums = np.concatenate([np.zeros((len(values), 1)), np.cumsum(np.where(known, values, 0), axis=1)], axis=1)
+    counts = np.concatenate([np.zeros((len(values), 1)), np.cumsum(known, axis=1)], axis=1)
+    half = window // 2
+    positions = np.arange(values.shape[1])
+    start = np.clip(positions - half, 0, values.shape[1])
+    end = np.clip(positions + half + 1, 0, values.shape[1])
+    window_sums = sums[:, end] - sums[:, start]
+    window_counts = counts[:, end] - counts[:, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = window_sums / window_counts
+    return np.where(known, values, means)
+
+
+def gdp_covariate(base_path: str = DATA_PATH) -> Covariate:
+    """GDP per capita from GDP.xls, with the fixes of the GDP join (Taipei, North Korea).
+
+    Unlike the join, Chinese Taipei before 1980 gets its 1980 GDP (see gdp_join.read_gdp).
+    """
+    gdp = read_gdp(os.path.join(base_path, "GDP.xls"))
+    gdp = gdp[~gdp["Country Code"].isin(["INX", "GIB", "VGB"])].rename(columns={"Country Code": "NOC"})
+    covariate = Covariate.from_long(gdp, "GDP")
+    # Como no GDP join, a Coreia do Norte é a Coreia do Sul escalada
+    korea, north = covariate.codes.get_indexer(["KOR", "PRK"])
+    if korea >= 0 and north >= 0:
+        covariate.values[north] = covariate.values[korea] / N_S_KOREA_RATIO
+        covariate.present[north] = covariate.present[korea]
+    return covariate
+
+
+def hdi_covariate(base_path: str = DATA_PATH) -> Covariate:
+    """Human Development Index from HDI.csv ("..": unknown), countries mapped to the GDP.xls codes."""
+    hdi = pd.read_csv(os.path.join(base_path, "HDI.csv"), na_values="..")
+    names = pd.read_excel(os.path.join(base_path, "GDP.xls"), usecols=["Country Name", "Country Code"])
+    codes = dict(zip(names["Country Name"], names["Country Code"]))
+    codes.update(HDI_CODES)
+    hdi["NOC"] = hdi["Country"].map(codes)
+    unknown = hdi.loc[hdi["NOC"].isna(), "Country"].tolist()
+    if unknown:
+        print(f"HDI: países sem código ignorados: {', '.join(unknown)}")
+    years = [column for column in hdi.columns if column.isdigit()]
+    hdi = hdi.dropna(subset=["NOC"]).melt(id_vars=["NOC"], value_vars=years, var_name="Year", value_name="HDI")
+    hdi["Year"] = hdi["Year"].astype(int)
+    return Covariate.from_long(hdi.dropna(subset=["HDI"]), "HDI")
+
+
+LOADERS = {"GDP": gdp_covariate, "HDI": hdi_covariate}
+
+
+def load_covariates(names=tuple(LOADERS), fill: str = "interpolate", window: int = WINDOW,
+                    base_path: str = DATA_PATH) -> Dict[str, Covariate]:
+    return {name: LOADERS[name](base_path).filled(fill, window) for name in names}
+
+
+def team_codes(base_path: str = DATA_PATH) -> pd.DataFrame:
+    """(NOC, Team) pairs of the World Bank codes, used to translate athlete NOCs."""
+    names = pd.read_excel(os.path.join(base_path, "GDP.xls"), usecols=["Country Name", "Country Code"])
+    return names.rename(columns={"Country Code": "NOC", "Country Name": "Team"})
+
+
+def attach(df: pd.DataFrame, covariates: Dict[str, Covariate], teams: Optional[pd.DataFrame] = None,
+           noc: str = "NOC", year: str = "Year") -> pd.DataFrame:
+    """Copy of `df` with one column per covariate, gathered by (NOC, Year).
+
+    With `teams`, athlete NOCs are first translated to the covariate codes;
+    `df` keeps its own NOC column.
+    """
+    codes = df[noc]
+    if teams is not None:
+        codes = translate(codes, rename_noc(df, teams))
+    df = df.copy()
+    for name, covariate in covariates.items():
+        df[name] = covariate.gather(codes, df[year])[0]
+    return df
+
+
+def covariate_table(covariates: Dict[str, Covariate]) -> pd.DataFrame:
+    """Long table (NOC, Year, one column per covariate) with every known cell."""
+    tables = [covariate.to_long().set_index(["NOC", "Year"]) for covariate in covariates.values()]
+    return pd.concat(tables, axis=1).sort_index().reset_index()
+
+
+def from_table(df: pd.DataFrame) -> Dict[str, Covariate]:
+    """The covariates stored by `covariate_table`."""
+    names = [column for column in df.columns if column not in ("NOC", "Year")]
+    return {name: Covariate.from_long(df.dropna(subset=[name]), name) for name in names}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fill", choices=FILLS, default="interpolate")
+    parser.add_argument("--window", type=int, default=WINDOW, help="years, for moving_average")
+    parser.add_argument("--attach", help="also write this athlete-level table with the covariates attached, "
+                                         "as <table>_with_covariates")
+    args = parser.parse_args()
+
+    covariates = load_covariates(fill=args.fill, window=args.window)
+    print(write_table(covariate_table(covariates), "covariates"))
+    if args.attach:
+        df = attach(read_table(args.attach), covariates, team_codes())
+        print(write_table(df, f"{args.attach}_with_covariates"))
@@ -0,0 +1,91 @@
+"""Derived columns, declared once and computed on load.
+
+Each entry of DERIVED is a vectorized expression over its input columns plus a
+validity mask; rows outside the mask get NaN. `derive` adds the columns a
+table does not have but can compute from the ones it has, so BMI and Weight
+are computed the same way by the pipeline (polished_dataset), by `read_table`
+and by the API, instead of being stored in hand-updated copies of the tables.
+
+    python derived.py by_sport yourEvents   # columns each table can derive
+"""
+import sys
+from typing import Callable, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class Derived(NamedTuple):
+    name: str
+    inputs: Tuple[str, ...]
+    # Recebem um DataFrame (ou um dict de escalares) com as colunas de `inputs`
+    compute: Callable
+    valid: Callable
+
+
+def positive(*columns: str) -> Callable:
+    return lambda values: np.logical_and.reduce([np.asarray(values[column]) > 0 for column in columns])
+
+
+DERIVED = {
+    # Height em cm, Weight em kg
+    "BMI": Derived("BMI", ("Weight", "Height"),
+                   lambda df: df["Weight"] / (df["Height"] / 100) ** 2, positive("Weight", "Height")),
+    "Weight": Derived("Weight", ("Height", "BMI"),
+                      lambda df: df["BMI"] * (df["Height"] / 100) ** 2, positive("Height", "BMI")),
+}
+
+
+def column(df: pd.DataFrame, name: str) -> pd.Series:
+    """Values of the derived column `name` for the rows of `df` (NaN where not valid)."""
+    spec = DERIVED[name]
+    return spec.compute(df).where(spec.valid(df))
+
+
+def value(name: str, values: dict) -> Optional[float]:
+    """The derived column for one record given as a dict, None when its inputs are missing or not valid."""
+    spec = DERIVED[name]
+    if any(values.get(key) is None for key in spec.inputs) or not spec.valid(values):
+        return None
+    return float(spec.compute(values))
+
+
+def derivable(columns: Iterable[str], names: Optional[Iterable[str]] = None) -> list:
+    """The derived columns (of `names`, all by default) missing from `columns` whose inputs are there."""
+    columns = set(columns)
+    names = DERIVED if names is None else names
+    return [name for name in names
+            if name in DERIVED and name not in columns and set(DERIVED[name].inputs) <= columns]
+
+
+def inputs(names: Iterable[str]) -> list:
+    """Input columns needed to compute `names`."""
+    needed = []
+    for name in names:
+        needed += [column for column in DERIVED[name].inputs if column not in needed]
+    return needed
+
+
+def derive(df: pd.DataFrame, names: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """`df` plus the derived columns (of `names`, all by default) it lacks and can compute.
+
+    Columns already in `df` are kept as they are. A new column is placed right
+    after its first input, where the old update scripts put Weight.
+    """
+    missing = derivable(df.columns, names)
+    if not missing:
+        return df
+    df = df.copy(deep=False)
+    for name in missing:
+        df.insert(df.columns.get_loc(DERIVED[name].inputs[0]) + 1, name, column(df, name))
+    return df
+
+
+if __name__ == "__main__":
+    from storage import table_columns
+
+    if len(sys.argv) < 2:
+        print("Uso: python derived.py <tabela> [<tabela> ...]")
+        sys.exit(1)
+    for table in sys.argv[1:]:
+        print(f"{table}: {', '.join(derivable(table_columns(table))) or '-'}")
@@ -0,0 +1,100 @@
+"""Memory-mappable feature store.
+
+A table is stored as a directory with one contiguous .npy file per column:
+numeric columns as they are, text columns (Sex, Sport, Event, NOC, ...)
+dictionary-encoded as an integer code array whose categories are kept in
+manifest.json. Reading maps every file read-only, so all API workers share
+the same physical pages instead of each holding a parsed copy.
+
+    python feature_store.py features by_sport by_event
+"""
+import json
+import os
+import shutil
+import sys
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = "feature_store"
+MANIFEST = "manifest.json"
+
+
+def store_path(name: str, base_path: str) -> str:
+    return os.path.join(base_path, STORE_DIR, name)
+
+
+def manifest_path(name: str, base_path: str) -> str:
+    return os.path.join(store_path(name, base_path), MANIFEST)
+
+
+def _column_file(directory: str, column: str, suffix: str = "") -> str:
+    return os.path.join(directory, f"{column}{suffix}.npy")
+
+
+def write_store(df: pd.DataFrame, name: str, base_path: str) -> str:
+    """Writes `df` as a feature store directory and returns its manifest path.
+
+    The new version is written next to the old one and swapped in with a
+    rename, so readers never see a half-written store.
+    """
+    final = store_path(name, base_path)
+    tmp = f"{final}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            array = values.to_numpy()
+            if array.dtype == object:
+                # Inteiros/booleanos anuláveis viram float com NaN
+                array = values.to_numpy(dtype="float64", na_value=np.nan)
+            np.save(_column_file(tmp, column), np.ascontiguousarray(array))
+            columns.append({"name": column, "kind": "numeric"})
+        else:
+            # Categorical já escolhe o menor dtype de código para o número de categorias,
+            # o mesmo que o pandas usa na leitura, então os códigos não são copiados
+            categorical = pd.Categorical(values)
+            np.save(_column_file(tmp, column, ".codes"), categorical.codes)
+            columns.append({"name": column, "kind": "categorical",
+                            "categories": categorical.categories.tolist()})
+
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump({"rows": len(df), "columns": columns}, f)
+
+    old = f"{final}.old-{os.getpid()}"
+    if os.path.exists(final):
+        os.rename(final, old)
+    os.rename(tmp, final)
+    shutil.rmtree(old, ignore_errors=True)
+    return os.path.join(final, MANIFEST)
+
+
+def read_store(name: str, base_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Maps the stored table read-only. No column data is copied into the process."""
+    directory = store_path(name, base_path)
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    specs = {spec["name"]: spec for spec in manifest["columns"]}
+    data = {}
+    for column in (columns if columns is not None else specs):
+        spec = specs[column]
+        if spec["kind"] == "numeric":
+            data[column] = np.load(_column_file(directory, column), mmap_mode="r")
+        else:
+            codes = np.load(_column_file(directory, column, ".codes"), mmap_mode="r")
+            dtype = pd.CategoricalDtype(spec["categories"])
+            data[column] = pd.Categorical.from_codes(codes, dtype=dtype, validate=False)
+
+    return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    from storage import DATA_PATH, FILE_FORMATS, read_table
+
+    tables = sys.argv[1:] or ["features", "by_sport", "by_event"]
+    for table in tables:
+        print(write_store(read_table(table, formats=FILE_FORMATS), table, DATA_PATH))
@@ -0,0 +1,68 @@
+"""Fused mode of the pipeline: every stage of the athlete_events chain in one in-memory pass.
+
+athlete_events is read once (only the columns the chain uses) and GDP.xls
+once. Cleaning, the Summer filter, BMI, the event-size filter, both GDP joins,
+the features table and the aggregations then run on DataFrames in memory, and
+only the tables read by the API and by the dashboards are written. The result
+is the same as running the stage scripts one by one.
+
+    python fused.py                  # polished3_with_gdp, features, by_event, by_sport, noc_gdp, noc_year_gdp
+    python fused.py --intermediates  # also polished2, polished3, polished3_with_moy_gdp
+"""
+import argparse
+import os
+import time
+from typing import Dict
+
+import pandas as pd
+
+from storage import DATA_PATH, read_table, write_table
+from polished_dataset import RAW_DTYPES, polish, source_columns
+from polished_dataset_2 import filter_small_events
+from gdp_join import fill_gdp, join_gdp, read_gdp
+from get_features_dataset import columns as feature_columns
+from get_by_event import aggregate
+from noc_to_gdp import noc_gdp, noc_year_gdp
+
+OUTPUTS = ("polished3_with_gdp", "features", "by_event", "by_sport", "noc_gdp", "noc_year_gdp")
+INTERMEDIATES = ("polished2", "polished3", "polished3_with_moy_gdp")
+
+
+def build(athletes: pd.DataFrame, gdp: pd.DataFrame, intermediates: bool = False) -> Dict[str, pd.DataFrame]:
+    """Table name -> DataFrame for every artifact of the chain, from the raw tables."""
+    polished2 = polish(athletes)
+    polished3 = filter_small_events(polished2)
+    with_gdp = join_gdp(polished3, fill_gdp(gdp, "country"))
+    with_moy_gdp = join_gdp(polished3, fill_gdp(gdp, "year"))
+    features = with_moy_gdp[feature_columns]
+
+    tables = {
+        "polished3_with_gdp": with_gdp,
+        "features": features,
+        "by_event": aggregate(features, "Event"),
+        "by_sport": aggregate(features, "Sport"),
+        "noc_gdp": noc_gdp(with_gdp),
+        "noc_year_gdp": noc_year_gdp(with_gdp),
+    }
+    if intermediates:
+        tables.update(polished2=polished2, polished3=polished3, polished3_with_moy_gdp=with_moy_gdp)
+    return tables
+
+
+def run(base_path: str = DATA_PATH, intermediates: bool = False) -> Dict[str, str]:
+    """Builds and writes the artifacts; returns table name -> path written."""
+    athletes = read_table("athlete_events", columns=source_columns(base_path), dtype=RAW_DTYPES, base_path=base_path)
+    gdp = read_gdp(os.path.join(base_path, "GDP.xls"))
+    tables = build(athletes, gdp, intermediates)
+    return {name: write_table(df, name, base_path=base_path) for name, df in tables.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intermediates", action="store_true", help="also write the intermediate tables")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for path in run(intermediates=args.intermediates).values():
+        print(path)
+    print(f"{time.perf_counter() - start:.1f}s")
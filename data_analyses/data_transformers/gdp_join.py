@@ -0,0 +1,79 @@
+"""Joins the GDP per capita of each NOC and Year into polished3 (ported from gdp.ipynb and gdp with_moy.ipynb).
+
+Missing GDP values are filled in one of two ways:
+
+    country  values before the first known year of a country get that first
+             value, the remaining gaps the mean of the country (gdp.ipynb)
+             -> polished3_with_gdp
+    year     gaps get the mean of all countries in that year (gdp with_moy.ipynb)
+             -> polished3_with_moy_gdp
+
+    python gdp_join.py --fill country
+"""
+import argparse
+import os
+
+import pandas as pd
+
+from storage import DATA_PATH, read_table, write_table
+import covariates
+from covariates import Covariate, N_S_KOREA_RATIO, TAIPEI_GDP, rename_noc, translate
+
+OUTPUTS = {"country": "polished3_with_gdp", "year": "polished3_with_moy_gdp"}
+
+
+def read_gdp(path: str) -> pd.DataFrame:
+    """covariates.read_gdp with the Chinese Taipei values of the notebooks."""
+    # Os notebooks preenchem 1960-1979 com TAIPEI_GDP[0][0], que é o ano (1980) e não o
+    # GDP. Mantido só aqui para que polished3_with_gdp/_moy_gdp continuem iguais aos do
+    # notebook; o gdp_covariate usa o GDP de 1980
+    return covariates.read_gdp(path, taipei_before_1980=TAIPEI_GDP[0][0])
+
+
+def fill_gdp(gdp: pd.DataFrame, fill: str) -> pd.DataFrame:
+    """Copy of `gdp` with the gaps filled by `fill` (country or year), NOC/Team columns."""
+    gdp = gdp.copy()
+    code = gdp["Country Code"]
+    if fill == "country":
+        # Anos antes do primeiro valor conhecido do país recebem esse valor. Como no
+        # notebook, o ano é contado pela posição da linha a partir de 1960
+        gdp["first_year"] = 1960 + gdp.groupby("Country Code").cumcount()
+        known = gdp.dropna(subset=["GDP"]).drop_duplicates("Country Code").set_index("Country Code")
+        first_year = code.map(known["first_year"])
+        first_gdp = code.map(known["GDP"])
+        gdp = gdp.drop(columns=["first_year"])
+        gdp.loc[gdp["Year"] < first_year, "GDP"] = first_gdp
+        gdp["GDP"] = gdp["GDP"].fillna(gdp.groupby("Country Code")["GDP"].transform("mean"))
+    else:
+        gdp["GDP"] = gdp["GDP"].fillna(gdp.groupby("Year")["GDP"].transform("mean"))
+
+    gdp = gdp[~gdp["Country Code"].isin(["INX", "GIB", "VGB"])]
+    korea = gdp.loc[gdp["Country Code"] == "KOR", "GDP"].values
+    gdp.loc[gdp["Country Code"] == "PRK", "GDP"] = korea / N_S_KOREA_RATIO
+    return gdp.rename(columns={"Country Code": "NOC", "Country Name": "Team"})
+
+
+def load_gdp(path: str, fill: str) -> pd.DataFrame:
+    return fill_gdp(read_gdp(path), fill)
+
+
+def join_gdp(athletes: pd.DataFrame, gdp: pd.DataFrame) -> pd.DataFrame:
+    athletes = athletes.copy()
+    athletes["NOC"] = translate(athletes["NOC"], rename_noc(athletes, gdp))
+    # Gather no array NOC x Year em vez de merge; `present` mantém só as linhas que o
+    # inner join manteria (NOC e Year existentes na tabela de GDP)
+    values, present = Covariate.from_long(gdp, "GDP").gather(athletes["NOC"], athletes["Year"])
+    # drop everything that is before 1960
+    keep = present & (athletes["Year"].to_numpy() >= 1960)
+    df = athletes[keep].assign(GDP=values[keep])
+    return df.drop(columns=["Unnamed: 0"], errors="ignore")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Joins GDP per capita into polished3.")
+    parser.add_argument("--fill", choices=list(OUTPUTS), default="country")
+    args = parser.parse_args()
+
+    gdp = load_gdp(os.path.join(DATA_PATH, "GDP.xls"), args.fill)
+    df = join_gdp(read_table("polished3"), gdp)
+    print(write_table(df, OUTPUTS[args.fill]))
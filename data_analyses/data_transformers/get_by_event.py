@@ -1,7 +1,15 @@
 import pandas as pd
+from storage import read_table, write_table
 
 columns = ['Age', 'Height', 'BMI', 'GDP', 'Event', 'Sex']
-df = pd.read_csv("../data/features.csv")
-df = df[columns]
-aggregated_df = df.groupby(['Event', 'Sex'], as_index=False).mean()
-aggregated_df.to_csv("../data/by_event.csv", index=False)
+
+
+def aggregate(df: pd.DataFrame, group: str) -> pd.DataFrame:
+    """Mean of Age, Height, BMI and GDP by (`group`, Sex)."""
+    return df[['Age', 'Height', 'BMI', 'GDP', group, 'Sex']].groupby([group, 'Sex'], as_index=False, observed=True).mean()
+
+
+if __name__ == "__main__":
+    df = read_table("features", columns=columns)
+    aggregated_df = aggregate(df, 'Event')
+    write_table(aggregated_df, "by_event")
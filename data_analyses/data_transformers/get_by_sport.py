@@ -1,7 +1,10 @@
 import pandas as pd
+from storage import read_table, write_table
+from get_by_event import aggregate
 
 columns = ['Age', 'Height', 'BMI', 'GDP', 'Sport', 'Sex']
-df = pd.read_csv("../data/features.csv")
-df = df[columns]
-aggregated_df = df.groupby(['Sport', 'Sex'], as_index=False).mean()
-aggregated_df.to_csv("../data/by_sport.csv", index=False)
+
+if __name__ == "__main__":
+    df = read_table("features", columns=columns)
+    aggregated_df = aggregate(df, 'Sport')
+    write_table(aggregated_df, "by_sport")
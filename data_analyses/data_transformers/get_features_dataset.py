@@ -1,7 +1,9 @@
 import pandas as pd
+from storage import read_table, write_table
 
 columns = ['Sex', 'Age', 'Height', 'BMI', 'GDP', 'Sport', 'Event']
-df = pd.read_csv("../data/polished3_with_moy_gdp.csv")
-df = df[columns]
 
-df.to_csv("../data/features.csv", index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    df = read_table("polished3_with_moy_gdp", columns=columns)
+
+    write_table(df, "features")
@@ -1,5 +1,9 @@
+import argparse
+
 import numpy as np
 import pandas as pd
+from scipy.special import ndtr, ndtri
+from storage import write_chunks
 
 # Define the age groups and their counts
 age_groups = [
@@ -26,63 +30,66 @@ age_groups = [
     {'age_group': '100+', 'count_M': 110838, 'count_F': 476160, 'age_min': 100, 'age_max': 105},
 ]
 
-def generate_positive_normal(mean, std, size):
-    """Generate positive values from a normal distribution."""
-    vals = np.random.normal(loc=mean, scale=std, size=size)
-    while np.any(vals <= 0):
-        n_negative = np.sum(vals <= 0)
-        vals[vals <= 0] = np.random.normal(loc=mean, scale=std, size=n_negative)
-    return vals
-
-def generate_data_for_gender(sex, n_samples):
-    counts = []
-    age_mins = []
-    age_maxs = []
-    for ag in age_groups:
-        counts.append(ag['count_M'] if sex == 'M' else ag['count_F'])
-        age_mins.append(ag['age_min'])
-        age_maxs.append(ag['age_max'])
-    total_count = sum(counts)
-    proportions = [count / total_count for count in counts]
-    # Sample age groups according to proportions
-    chosen_age_groups = np.random.choice(len(age_groups), size=n_samples, p=proportions)
-    ages = []
-    for idx in chosen_age_groups:
-        age_min = age_mins[idx]
-        age_max = age_maxs[idx]
-        # Generate an age uniformly within the age range
-        age = np.random.randint(age_min, age_max + 1)
-        ages.append(age)
-    # Generate Height and BMI
-    if sex == 'M':
-        height_mean = 173
-        height_std = 6.35
-        bmi_mean = 24.2
-        bmi_std = 4.5
-    else:
-        height_mean = 159
-        height_std = 5.59
-        bmi_mean = 24.4
-        bmi_std = 5
-    heights = generate_positive_normal(height_mean, height_std, n_samples)
-    bmis = generate_positive_normal(bmi_mean, bmi_std, n_samples)
-    data = pd.DataFrame({
+# Altura (cm) e IMC por sexo: (média, desvio)
+BODY_PARAMS = {
+    'M': {'Height': (173, 6.35), 'BMI': (24.2, 4.5)},
+    'F': {'Height': (159, 5.59), 'BMI': (24.4, 5)},
+}
+
+AGE_MIN = np.array([ag['age_min'] for ag in age_groups])
+AGE_MAX = np.array([ag['age_max'] for ag in age_groups])
+
+ROWS_PER_SEX = 10000
+CHUNK_SIZE = 1_000_000
+SEED = 0
+
+
+def truncated_normal(rng, mean, std, size, low=0.0):
+    """Normal(mean, std) restricted to values above `low`.
+
+    Inverse-CDF sampling: uniforms drawn only over the part of the CDF above
+    `low`, so there is no resampling loop.
+    """
+    lower = ndtr((low - mean) / std)
+    return mean + std * ndtri(rng.uniform(lower, 1.0, size))
+
+
+def age_proportions(sex):
+    counts = np.array([ag['count_M'] if sex == 'M' else ag['count_F'] for ag in age_groups], dtype=float)
+    return counts / counts.sum()
+
+
+def generate_data_for_gender(sex, n_samples, rng):
+    # Sorteia a faixa etária pela proporção da população e a idade uniforme dentro da faixa
+    chosen_age_groups = rng.choice(len(age_groups), size=n_samples, p=age_proportions(sex))
+    ages = rng.integers(AGE_MIN[chosen_age_groups], AGE_MAX[chosen_age_groups] + 1)
+    (height_mean, height_std), (bmi_mean, bmi_std) = BODY_PARAMS[sex]['Height'], BODY_PARAMS[sex]['BMI']
+    return pd.DataFrame({
         'Age': ages,
-        'Height': heights,
-        'BMI': bmis,
-        'Sex': sex
+        'Height': truncated_normal(rng, height_mean, height_std, n_samples),
+        'BMI': truncated_normal(rng, bmi_mean, bmi_std, n_samples),
+        'Sex': sex,
     })
-    return data
 
-# Generate datasets for both genders
-data_male = generate_data_for_gender('M', 10000)
-data_female = generate_data_for_gender('F', 10000)
 
-# Combine datasets
-data = pd.concat([data_male, data_female], ignore_index=True)
+def generate_population(rows_per_sex, chunk_size=CHUNK_SIZE, seed=SEED):
+    """Yields the population in chunks of at most `chunk_size` rows, men first.
+
+    Each chunk has its own generator seeded from (seed, sex, chunk index), so the
+    output depends only on the arguments.
+    """
+    for sex_index, sex in enumerate(('M', 'F')):
+        for chunk_index, start in enumerate(range(0, rows_per_sex, chunk_size)):
+            rng = np.random.default_rng([seed, sex_index, chunk_index])
+            yield generate_data_for_gender(sex, min(chunk_size, rows_per_sex - start), rng)
+
 
-# Display first few rows
-print(data.head())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates the global_distribution reference population.")
+    parser.add_argument("rows_per_sex", nargs="?", type=int, default=ROWS_PER_SEX)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
 
-# Optionally, save the dataset to a CSV file
-data.to_csv('../data/global_distribution.csv', index=False)
+    # Escreve direto no armazenamento colunar, um chunk por vez
+    print(write_chunks(generate_population(args.rows_per_sex, args.chunk_size, args.seed), "global_distribution"))
@@ -1,14 +1,27 @@
 import pandas as pd
-
-df = pd.read_csv("../data/polished3_with_gdp.csv")
+from storage import read_table, write_table
 
 columns = ['NOC', 'GDP']
-df = df[columns]
 
-df = df.dropna(subset=['NOC', 'GDP'])
 
-noc_gdp_df = df.groupby('NOC', as_index=False).mean()
+def noc_gdp(df: pd.DataFrame) -> pd.DataFrame:
+    """Mean GDP of each NOC."""
+    df = df[columns].dropna(subset=['NOC', 'GDP'])
+    return df.groupby('NOC', as_index=False, observed=True).mean()
+
+
+def noc_year_gdp(df: pd.DataFrame) -> pd.DataFrame:
+    """Mean GDP of each NOC in each Games year, for the year-aware lookups of the API."""
+    df = df[['NOC', 'Year', 'GDP']].dropna(subset=['NOC', 'GDP'])
+    return df.groupby(['NOC', 'Year'], as_index=False, observed=True).mean()
+
+
+if __name__ == "__main__":
+    df = read_table("polished3_with_gdp", columns=['NOC', 'Year', 'GDP'])
+
+    noc_gdp_df = noc_gdp(df)
 
-noc_gdp_df.to_csv("../data/noc_gdp.csv", index=False)
+    write_table(noc_gdp_df, "noc_gdp")
+    write_table(noc_year_gdp(df), "noc_year_gdp")
 
-print(noc_gdp_df)
+    print(noc_gdp_df)
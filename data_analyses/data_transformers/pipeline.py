@@ -0,0 +1,265 @@
+"""Incremental runner for the data_transformers scripts.
+
+Each stage is a script plus the tables (or raw files, when the name has an
+extension) it reads and writes. Stages run in topological order, independent
+stages in parallel, and a stage is skipped when the content hash of its inputs
+and of its script is the same as in its last successful run and its outputs
+are unchanged since then. A stage whose output comes out identical does not
+make the stages after it run again. Hashes are kept in DATA_PATH/pipeline_state.json.
+
+    python pipeline.py                  # everything that changed
+    python pipeline.py by_sport         # only what by_sport needs
+    python pipeline.py --force --jobs 2
+    python pipeline.py --dry-run
+    python pipeline.py --fused          # athlete_events chain in one pass (fused.py)
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from storage import DATA_PATH, find_artifact
+from fused import OUTPUTS as FUSED_OUTPUTS
+
+SCRIPTS_PATH = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = "pipeline_state.json"
+JOBS = os.cpu_count() or 1
+
+
+class Stage(NamedTuple):
+    name: str
+    script: str
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    args: Tuple[str, ...] = ()
+    # Outros módulos importados pelo script, que também entram no hash
+    sources: Tuple[str, ...] = ()
+
+
+STAGES = [
+    Stage("polished_dataset", "polished_dataset.py", ("athlete_events",), ("polished2",), sources=("derived.py",)),
+    Stage("polished_dataset_2", "polished_dataset_2.py", ("polished2",), ("polished3",)),
+    Stage("gdp_join", "gdp_join.py", ("polished3", "GDP.xls"), ("polished3_with_gdp",), ("--fill", "country"),
+          sources=("covariates.py",)),
+    Stage("gdp_join_moy", "gdp_join.py", ("polished3", "GDP.xls"), ("polished3_with_moy_gdp",), ("--fill", "year"),
+          sources=("covariates.py",)),
+    Stage("get_features_dataset", "get_features_dataset.py", ("polished3_with_moy_gdp",), ("features",)),
+    Stage("get_by_event", "get_by_event.py", ("features",), ("by_event",)),
+    Stage("get_by_sport", "get_by_sport.py", ("features",), ("by_sport",), sources=("get_by_event.py",)),
+    Stage("noc_to_gdp", "noc_to_gdp.py", ("polished3_with_gdp",), ("noc_gdp", "noc_year_gdp")),
+    Stage("global_data", "global_data.py", (), ("global_distribution",)),
+    Stage("covariates", "covariates.py", ("GDP.xls", "HDI.csv"), ("covariates",)),
+]
+
+# --fused: a cadeia de athlete_events vira uma etapa só, sem tabelas intermediárias
+FUSED_STAGES = [
+    Stage("fused", "fused.py", ("athlete_events", "GDP.xls"), FUSED_OUTPUTS,
+          sources=("polished_dataset.py", "derived.py", "polished_dataset_2.py", "gdp_join.py", "get_features_dataset.py",
+                   "get_by_event.py", "noc_to_gdp.py", "covariates.py")),
+    Stage("global_data", "global_data.py", (), ("global_distribution",)),
+    Stage("covariates", "covariates.py", ("GDP.xls", "HDI.csv"), ("covariates",)),
+]
+
+
+def dependencies(stages: List[Stage]) -> Dict[str, set]:
+    """Stage name -> names of the stages producing its inputs."""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"'{output}' é produzido por {producers[output]} e {stage.name}")
+            producers[output] = stage.name
+    return {stage.name: {producers[i] for i in stage.inputs if i in producers} for stage in stages}
+
+
+def topological_order(stages: List[Stage]) -> List[Stage]:
+    deps = dependencies(stages)
+    by_name = {stage.name: stage for stage in stages}
+    order, done = [], set()
+    while len(order) < len(stages):
+        ready = [s for s in stages if s.name not in done and deps[s.name] <= done]
+        if not ready:
+            cycle = sorted(name for name in by_name if name not in done)
+            raise ValueError(f"Ciclo entre as etapas: {', '.join(cycle)}")
+        order.extend(ready)
+        done.update(stage.name for stage in ready)
+    return order
+
+
+def select(stages: List[Stage], targets: List[str]) -> List[Stage]:
+    """`targets` (stage or output names) and everything upstream of them."""
+    if not targets:
+        return stages
+    deps = dependencies(stages)
+    by_output = {output: stage.name for stage in stages for output in stage.outputs}
+    pending = []
+    for target in targets:
+        name = by_output.get(target, target)
+        if name not in deps:
+            raise ValueError(f"Etapa ou tabela desconhecida: {target}")
+        pending.append(name)
+    wanted = set()
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+    return [stage for stage in stages if stage.name in wanted]
+
+
+def artifact_files(name: str, base_path: str) -> List[str]:
+    """Files holding the table (or raw file) `name`, as the readers would find it."""
+    if os.path.splitext(name)[1]:
+        path = os.path.join(base_path, name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return [path]
+    path, _ = find_artifact(name, base_path)
+    if os.path.basename(path) == "manifest.json":
+        directory = os.path.dirname(path)
+        return [os.path.join(directory, file) for file in sorted(os.listdir(directory))]
+    return [path]
+
+
+def content_hash(paths: List[str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def input_hash(stage: Stage, base_path: str) -> str:
+    """Hash of the script (and its sources), its arguments and the content of every input."""
+    scripts = [os.path.join(SCRIPTS_PATH, script) for script in (stage.script, *stage.sources)]
+    parts = [content_hash(scripts), " ".join(stage.args)]
+    parts += [f"{name}:{content_hash(artifact_files(name, base_path))}" for name in stage.inputs]
+    return hashlib.blake2b("\n".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def output_hashes(stage: Stage, base_path: str) -> Optional[Dict[str, str]]:
+    """Hash of each output, or None if one of them is missing."""
+    try:
+        return {name: content_hash(artifact_files(name, base_path)) for name in stage.outputs}
+    except FileNotFoundError:
+        return None
+
+
+class Pipeline:
+    def __init__(self, stages: List[Stage] = STAGES, base_path: str = DATA_PATH, jobs: int = JOBS,
+                 force: bool = False, dry_run: bool = False):
+        self.stages = topological_order(stages)
+        self.deps = dependencies(stages)
+        self.base_path = base_path
+        self.jobs = jobs
+        self.force = force
+        self.dry_run = dry_run
+        self.state_path = os.path.join(base_path, STATE_FILE)
+        self.state = self.load_state()
+
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        tmp = f"{self.state_path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def up_to_date(self, stage: Stage, inputs: str) -> bool:
+        previous = self.state.get(stage.name)
+        if self.force or previous is None or previous["inputs"] != inputs:
+            return False
+        return output_hashes(stage, self.base_path) == previous["outputs"]
+
+    def execute(self, stage: Stage, upstream_ran: bool = False) -> Tuple[str, float]:
+        """Runs the stage if needed; returns its status (skipped, ran, failed) and duration."""
+        start = time.perf_counter()
+        if self.dry_run and upstream_ran:
+            # As entradas ainda não existem ou vão mudar
+            return "ran", 0.0
+        try:
+            inputs = input_hash(stage, self.base_path)
+        except FileNotFoundError as e:
+            log(f"{stage.name}: entrada não encontrada ({e})")
+            return "failed", 0.0
+        if self.up_to_date(stage, inputs):
+            return "skipped", time.perf_counter() - start
+        if self.dry_run:
+            return "ran", 0.0
+
+        command = [sys.executable, os.path.join(SCRIPTS_PATH, stage.script), *stage.args]
+        result = subprocess.run(command, env={**os.environ, "OLYMPICS_DATA_PATH": self.base_path},
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if result.returncode != 0:
+            log(f"{stage.name} falhou (código {result.returncode}):\n{result.stdout}")
+            return "failed", time.perf_counter() - start
+        outputs = output_hashes(stage, self.base_path)
+        if outputs is None:
+            log(f"{stage.name} terminou sem escrever {', '.join(stage.outputs)}")
+            return "failed", time.perf_counter() - start
+        self.state[stage.name] = {"inputs": inputs, "outputs": outputs}
+        return "ran", time.perf_counter() - start
+
+    def run(self) -> Dict[str, str]:
+        """Runs the stages, up to `jobs` at a time; returns stage name -> status.
+
+        Stages after a failed one are not run ("blocked").
+        """
+        status = {}
+        running = {}
+        pending = list(self.stages)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while pending or running:
+                for stage in list(pending):
+                    deps = self.deps[stage.name]
+                    if any(status.get(dep) in ("failed", "blocked") for dep in deps):
+                        status[stage.name] = "blocked"
+                        pending.remove(stage)
+                    elif deps <= status.keys() and len(running) < self.jobs:
+                        upstream_ran = any(status[dep] == "ran" for dep in deps)
+                        running[executor.submit(self.execute, stage, upstream_ran)] = stage
+                        pending.remove(stage)
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    status[stage.name], elapsed = future.result()
+                    log(f"{stage.name}: {status[stage.name]} ({elapsed:.1f}s)")
+                if not self.dry_run:
+                    self.save_state()
+        return status
+
+
+def log(message: str):
+    print(f"[pipeline] {message}", file=sys.stderr, flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", help="stages or tables to build (default: all)")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="stages run in parallel")
+    parser.add_argument("--force", action="store_true", help="run every selected stage")
+    parser.add_argument("--dry-run", action="store_true", help="only list the stages that would run")
+    parser.add_argument("--fused", action="store_true", help="run the athlete_events chain in one pass")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stages = FUSED_STAGES if args.fused else STAGES
+    pipeline = Pipeline(select(stages, args.targets), jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    status = pipeline.run()
+    counts = {kind: sum(value == kind for value in status.values()) for kind in ("ran", "skipped", "failed", "blocked")}
+    log(", ".join(f"{count} {kind}" for kind, count in counts.items()) + f" em {time.perf_counter() - start:.1f}s")
+    sys.exit(1 if counts["failed"] or counts["blocked"] else 0)
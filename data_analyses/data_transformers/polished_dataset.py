@@ -1,21 +1,103 @@
-import pandas as pd
+"""Cleans athlete_events into polished2.
+
+The raw table is read in chunks of --chunk-size rows with explicit dtypes and
+only the columns used, each chunk is cleaned and appended to polished2, so the
+memory used does not grow with the size of the extract. At the end the rows
+dropped by each rule are reported.
+
+    python polished_dataset.py --chunk-size 200000
+"""
+import argparse
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional
 
-base_file_path = '../data/'
+import numpy as np
+import pandas as pd
 
-df = pd.read_csv(base_file_path+"athlete_events.csv")
+import derived
+from storage import DATA_PATH, read_chunks, table_columns, write_chunks
 
 columns_to_drop = ['ID', 'Name', 'Sex', 'Age', 'Height', 'Weight', 'Team', 'NOC', 'Games',
        'Year', 'Season', 'City', 'Sport', 'Event']
-df.dropna(subset=columns_to_drop, inplace=True)
-
-df.fillna("No Medal", inplace=True)
-df = df[df.Season == "Summer"]
 
 sports_few_data_points = ["Motorboating", "Figure Skating", "Lacrosse", "Ice Hockey", "Rugby", "Tug-Of-War",
                            "Art Competitions"]
-df = df[~df.Sport.isin(sports_few_data_points)]
 
-df["Won Medal"] = df.Medal != "No Medal"
-df["BMI"] = df["Weight"] / (df["Height"] / 100) ** 2
-print(df.head(), df.shape)
-df.to_csv(base_file_path+"polished2.csv")
\ No newline at end of file
+SOURCE_COLUMNS = columns_to_drop + ["Medal"]
+
+# Os mesmos tipos que o pandas infere no arquivo inteiro, fixados para que todos os chunks
+# tenham o mesmo schema (um chunk sem medalhas, por exemplo, viraria float)
+RAW_DTYPES = {column: "object" for column in SOURCE_COLUMNS}
+RAW_DTYPES.update({"ID": "int64", "Year": "int64", "Age": "float64", "Height": "float64", "Weight": "float64"})
+
+CHUNK_SIZE = 200_000
+
+# Regras de limpeza, na ordem em que são aplicadas: nome -> linhas que passam
+RULES = {
+    "incomplete": lambda df: df[columns_to_drop].notna().all(axis=1),
+    "not_summer": lambda df: df.Season == "Summer",
+    "few_data_points_sport": lambda df: ~df.Sport.isin(sports_few_data_points),
+}
+
+
+def source_columns(base_path: str = DATA_PATH) -> List[str]:
+    """The columns of athlete_events used by the pipeline, in the order of the file."""
+    return [column for column in table_columns("athlete_events", base_path) if column in SOURCE_COLUMNS]
+
+
+def polish(df: pd.DataFrame, counts: Optional[Counter] = None) -> pd.DataFrame:
+    """Complete Summer rows without the sports with few data points, plus Won Medal and BMI.
+
+    The rules are combined in one mask, so the rows are copied once. With
+    `counts`, the rows read, kept and dropped by each rule are added to it.
+    """
+    keep = np.ones(len(df), dtype=bool)
+    for rule, passes in RULES.items():
+        passed = passes(df).to_numpy()
+        if counts is not None:
+            counts[rule] += int(np.count_nonzero(keep & ~passed))
+        keep &= passed
+    if counts is not None:
+        counts["read"] += len(df)
+        counts["kept"] += int(np.count_nonzero(keep))
+
+    # Depois do dropna só as colunas fora de columns_to_drop (Medal) ainda podem ter NaN
+    df = df[keep].fillna({column: "No Medal" for column in df.columns if column not in columns_to_drop})
+
+    df["Won Medal"] = df.Medal != "No Medal"
+    df["BMI"] = derived.column(df, "BMI")
+    return df
+
+
+def polish_chunks(chunks: Iterable[pd.DataFrame], counts: Counter) -> Iterator[pd.DataFrame]:
+    # Chunks que ficaram vazios são pulados: o schema do Parquet vem do primeiro chunk
+    # escrito, e colunas de texto vazias não têm tipo. Só é escrito um se todos ficarem vazios
+    written = False
+    polished = None
+    for chunk in chunks:
+        polished = polish(chunk, counts)
+        if not polished.empty:
+            written = True
+            yield polished
+    if not written and polished is not None:
+        yield polished
+
+def report(counts: Counter) -> str:
+    lines = [f"{counts['read']} linhas lidas"]
+    remaining = counts["read"]
+    for rule in RULES:
+        lines.append(f"  {rule:<24} descartou {counts[rule]:>10} de {remaining}")
+        remaining -= counts[rule]
+    lines.append(f"{counts['kept']} linhas mantidas")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    counts = Counter()
+    chunks = read_chunks("athlete_events", args.chunk_size, columns=source_columns(), dtype=RAW_DTYPES)
+    print(write_chunks(polish_chunks(chunks, counts), "polished2"))
+    print(report(counts))
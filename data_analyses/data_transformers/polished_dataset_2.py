@@ -1,10 +1,17 @@
 import pandas as pd
+from storage import read_table, write_table
 
-base_file_path = '../data/'
+MIN_EVENT_SIZE = 10
 
 
-df = pd.read_csv(base_file_path+"polished2.csv")
+def filter_small_events(df: pd.DataFrame, min_size: int = MIN_EVENT_SIZE) -> pd.DataFrame:
+    # Mesmo resultado de groupby("Event").filter(lambda x: len(x) >= 10), sem uma chamada por grupo
+    return df[df.groupby("Event")["Event"].transform("size") >= min_size]
 
-filtered_df = df.groupby("Event").filter(lambda x: len(x) >= 10)
 
-filtered_df.to_csv(base_file_path+"polished3.csv", index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    df = read_table("polished2")
+
+    filtered_df = filter_small_events(df)
+
+    write_table(filtered_df, "polished3")
@@ -0,0 +1,224 @@
+"""Typed columnar storage for the pipeline artifacts.
+
+Every table produced by data_transformers (polished2, polished3, features,
+by_event, ...) is written as Parquet by default and read back with its dtypes
+and with column projection, so consumers do not re-parse text or re-infer
+types. Tables that only exist as CSV (the raw athlete_events.csv, the files
+committed to data/) are still readable: `read_table` falls back to the first
+format found on disk.
+
+A table that also has a memory-mapped feature store (see feature_store.py) is
+read from it first; `write_table` keeps an existing store in sync. Derived
+columns such as BMI and Weight (see derived.py) are computed on load when a
+table does not store them.
+
+    python storage.py convert athlete_events   # writes athlete_events.parquet
+"""
+import json
+import os
+import sys
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import derived
+import feature_store
+
+DATA_PATH = os.environ.get("OLYMPICS_DATA_PATH", "../data/")
+
+# Formato usado na escrita: parquet, feather, csv ou store
+FORMAT = os.environ.get("OLYMPICS_STORAGE_FORMAT", "parquet")
+
+# Também exporta um .csv de cada artefato escrito
+EXPORT_CSV = os.environ.get("OLYMPICS_EXPORT_CSV", "0") == "1"
+
+EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+STORE = "store"
+
+# Ordem de preferência na leitura
+FILE_FORMATS = ["parquet", "feather", "csv"]
+READ_ORDER = [STORE] + FILE_FORMATS
+
+
+def artifact_path(name: str, fmt: str = FORMAT, base_path: str = DATA_PATH) -> str:
+    if fmt == STORE:
+        return feature_store.manifest_path(name, base_path)
+    return os.path.join(base_path, name + EXTENSIONS[fmt])
+
+
+def find_artifact(name: str, base_path: str = DATA_PATH, formats: List[str] = READ_ORDER) -> tuple:
+    """(path, format) of the stored table, trying the formats in `formats` order.
+
+    Raises FileNotFoundError when the table does not exist in any format.
+    """
+    for fmt in formats:
+        path = artifact_path(name, fmt, base_path)
+        if os.path.exists(path):
+            return path, fmt
+    raise FileNotFoundError(f"Artefato '{name}' não encontrado em {base_path}")
+
+
+def table_columns(name: str, base_path: str = DATA_PATH, formats: List[str] = READ_ORDER) -> List[str]:
+    """Column names of the stored table, in order, without reading its data."""
+    path, fmt = find_artifact(name, base_path, formats)
+    if fmt == STORE:
+        with open(path) as f:
+            return [column["name"] for column in json.load(f)["columns"]]
+    if fmt == "parquet":
+        return pq.read_schema(path).names
+    if fmt == "feather":
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).schema.names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def read_table(name: str, columns: Optional[List[str]] = None, dtype: Optional[dict] = None,
+               base_path: str = DATA_PATH, formats: List[str] = READ_ORDER, derive: Iterable[str] = ()) -> pd.DataFrame:
+    """Reads a stored table, optionally only `columns`, casting to `dtype` where given.
+
+    Derived columns (derived.py) that the table does not store are computed
+    from their inputs on load: the ones in `columns`, or in `derive` when all
+    columns are read.
+    """
+    path, fmt = find_artifact(name, base_path, formats)
+    lazy = list(derive) if columns is None else []
+    read_columns = columns
+    if columns is not None and any(column in derived.DERIVED for column in columns):
+        lazy = derived.derivable(table_columns(name, base_path, [fmt]), columns)
+        read_columns = [column for column in columns if column not in lazy]
+        read_columns += [column for column in derived.inputs(lazy) if column not in read_columns]
+
+    if fmt == STORE:
+        df = feature_store.read_store(name, base_path, columns=read_columns)
+    elif fmt == "parquet":
+        df = pd.read_parquet(path, columns=read_columns)
+    elif fmt == "feather":
+        df = pd.read_feather(path, columns=read_columns)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        csv_dtype = {column: kind for column, kind in (dtype or {}).items() if column in header}
+        df = pd.read_csv(path, usecols=read_columns, dtype=csv_dtype)
+        if read_columns is not None:
+            df = df[read_columns]
+
+    df = _cast(df, dtype)
+    if lazy:
+        df = derived.derive(df, lazy)
+        if columns is not None:
+            df = df[columns]
+    return df
+
+
+def _cast(df: pd.DataFrame, dtype: Optional[dict]) -> pd.DataFrame:
+    if dtype:
+        casts = {column: kind for column, kind in dtype.items() if column in df.columns and df[column].dtype != kind}
+        if casts:
+            df = df.astype(casts)
+    return df
+
+
+def read_chunks(name: str, chunk_size: int, columns: Optional[List[str]] = None, dtype: Optional[dict] = None,
+                base_path: str = DATA_PATH, formats: List[str] = READ_ORDER) -> Iterator[pd.DataFrame]:
+    """Reads a stored table as DataFrames of at most `chunk_size` rows, like `read_table` otherwise.
+
+    CSV and Parquet are read one chunk at a time. The feature store is already
+    memory-mapped and feather is read whole; both are then sliced.
+    """
+    path, fmt = find_artifact(name, base_path, formats)
+    if fmt == "csv":
+        header = pd.read_csv(path, nrows=0).columns
+        csv_dtype = {column: kind for column, kind in (dtype or {}).items() if column in header}
+        for chunk in pd.read_csv(path, usecols=columns, dtype=csv_dtype, chunksize=chunk_size):
+            yield _cast(chunk[columns] if columns is not None else chunk, dtype)
+    elif fmt == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield _cast(batch.to_pandas(), dtype)
+    else:
+        df = read_table(name, columns, dtype, base_path, [fmt])
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def write_table(df: pd.DataFrame, name: str, fmt: str = FORMAT, csv: bool = EXPORT_CSV,
+                base_path: str = DATA_PATH) -> str:
+    """Writes `df` (without its index) as `name` in `fmt`, plus a CSV copy if `csv`.
+
+    Returns the path of the main file.
+    """
+    path = artifact_path(name, fmt, base_path)
+    df = df.reset_index(drop=True)
+    if fmt == STORE:
+        feature_store.write_store(df, name, base_path)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "feather":
+        df.to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+
+    if csv and fmt != "csv":
+        df.to_csv(artifact_path(name, "csv", base_path), index=False)
+    if fmt != STORE and os.path.exists(artifact_path(name, STORE, base_path)):
+        feature_store.write_store(df, name, base_path)
+    return path
+
+
+def write_chunks(chunks: Iterable[pd.DataFrame], name: str, fmt: str = FORMAT, csv: bool = EXPORT_CSV,
+                 base_path: str = DATA_PATH) -> str:
+    """Writes the DataFrames in `chunks` (same columns) as one table, one chunk in memory at a time.
+
+    Parquet gets one row group per chunk and CSV is appended to. The file is
+    written under a temporary name and renamed at the end. Feather and the
+    feature store need the whole table, so the chunks are concatenated for them.
+    Returns the path of the main file.
+    """
+    if fmt not in ("parquet", "csv"):
+        return write_table(pd.concat(list(chunks), ignore_index=True), name, fmt, csv, base_path)
+
+    path = artifact_path(name, fmt, base_path)
+    outputs = {fmt: path}
+    if csv and fmt != "csv":
+        outputs["csv"] = artifact_path(name, "csv", base_path)
+    tmp = {kind: f"{target}.tmp-{os.getpid()}" for kind, target in outputs.items()}
+
+    writer = None
+    first = True
+    try:
+        for chunk in chunks:
+            chunk = chunk.reset_index(drop=True)
+            if fmt == "parquet":
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp["parquet"], table.schema)
+                writer.write_table(table.cast(writer.schema))
+            if "csv" in tmp:
+                chunk.to_csv(tmp["csv"], index=False, header=first, mode="w" if first else "a")
+            first = False
+    finally:
+        if writer is not None:
+            writer.close()
+    if first:
+        raise ValueError(f"Nenhum chunk para escrever em '{name}'")
+
+    for kind, target in outputs.items():
+        os.replace(tmp[kind], target)
+    if os.path.exists(artifact_path(name, STORE, base_path)):
+        feature_store.write_store(read_table(name, base_path=base_path, formats=[fmt]), name, base_path)
+    return path
+
+
+def convert_table(name: str, fmt: str = FORMAT, base_path: str = DATA_PATH) -> str:
+    """Stores the CSV table `name` in `fmt` (e.g. the raw athlete_events.csv)."""
+    df = pd.read_csv(artifact_path(name, "csv", base_path))
+    return write_table(df, name, fmt=fmt, csv=False, base_path=base_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "convert":
+        print("Uso: python storage.py convert <tabela> [<tabela> ...]")
+        sys.exit(1)
+    for table in sys.argv[2:]:
+        print(convert_table(table))